@@ -0,0 +1,282 @@
+import multiprocessing
+import sys
+import numpy as np
+from mosfet_core import (DEFAULT_PARAMETERS, INPUT_FIELDS, NUMBER_FIELDS, PARAMETER_FIELDS, RESULT_FIELDS,
+                         calculate_graph_values, calculate_mosfet_params, evaluate_graph)
+
+# Random designs compared by check_against_scalar() unless another count is given
+CHECK_SAMPLES = 20000
+
+# Outputs returned by sweep() unless others are requested
+SWEEP_OUTPUTS = ("P_total", "Tj", "Rds_on_max", "Vds_min")
+
+# Results that are text labels; sweep outputs are numeric arrays, so these cannot be requested
+LABEL_RESULTS = ("cooling", "control_type")
+
+def _columns(source, fields):
+    """Pick the given fields from a dict of columns or a NumPy structured array."""
+    if isinstance(source, np.ndarray) and source.dtype.names:
+        missing = [key for key in fields if key not in source.dtype.names]
+    else:
+        missing = [key for key in fields if key not in source]
+    if missing:
+        raise KeyError(f"Missing batch fields: {', '.join(missing)}")
+    return {key: source[key] for key in fields}
+
+def _foc_column(foc):
+    """Normalize FOC flags given as booleans or as PyWebIO checkbox values ([True] / [])."""
+    if isinstance(foc, (list, tuple)) and any(isinstance(value, (list, tuple)) for value in foc):
+        # One checkbox value per design; np.asarray would reject the mix of [True] and []
+        return np.array([(value[0] if value else False) if isinstance(value, (list, tuple)) else value
+                         for value in foc], dtype=bool)
+    foc = np.asarray(foc)
+    if foc.dtype == object:
+        flags = [(value[0] if value else False) if isinstance(value, (list, tuple)) else value
+                 for value in foc.ravel()]
+        foc = np.array(flags, dtype=bool).reshape(foc.shape)
+    return foc.astype(bool)
+
+def calculate_mosfet_params_batch(data, params):
+    """Vectorized calculate_mosfet_params for many designs at once.
+
+    ``data`` and ``params`` are dicts of columns (or structured arrays) holding the
+    same keys as the scalar inputs and DEFAULT_PARAMETERS. Scalars and arrays are
+    broadcast together, and every result key is returned as an array of the
+    broadcast shape. Values match the scalar function exactly.
+    """
+    columns = dict(_columns(data, INPUT_FIELDS), **_columns(params, PARAMETER_FIELDS))
+    values = {key: _foc_column(value) if key == "foc" else np.asarray(value, dtype=float)
+              for key, value in columns.items()}
+
+    # The same graph as the scalar function; zero currents and overflows give infinities instead of warnings
+    with np.errstate(divide="ignore", over="ignore", invalid="ignore"):
+        evaluate_graph(values)
+    results = {key: values[key] for key in RESULT_FIELDS}
+
+    # Every column gets the full batch shape, even those that only depend on a scalar input
+    shape = np.broadcast(*results.values()).shape
+    return {key: value if np.shape(value) == shape else np.broadcast_to(value, shape)
+            for key, value in results.items()}
+
+def batch_row(results, index):
+    """Return one design of a batch result as the dict calculate_mosfet_params would give."""
+    row = {}
+    for key in RESULT_FIELDS:
+        value = results[key][index]
+        row[key] = value.item() if hasattr(value, "item") else value
+    return row
+
+def check_against_scalar(samples=CHECK_SAMPLES, seed=0):
+    """Results where calculate_mosfet_params disagrees with the batch engine or the graph on random designs.
+
+    Every input and parameter is drawn from a tenth to ten times its default,
+    in both control modes. The straight-line scalar function is compared bit for
+    bit with calculate_mosfet_params_batch and with CALCULATION_GRAPH evaluated
+    on the single design, as IncrementalCalculation does. Designs the scalar
+    function rejects are skipped. Returns (design, key, scalar value, other
+    value, other path) tuples; an empty list means every path agrees.
+    """
+    rng = np.random.default_rng(seed)
+    data = {key: DEFAULT_PARAMETERS[key] * 10 ** rng.uniform(-1, 1, samples) for key in NUMBER_FIELDS}
+    data["n_parallel"] = rng.integers(1, 9, samples).astype(float)
+    data["foc"] = rng.random(samples) < 0.5
+    params = {key: DEFAULT_PARAMETERS[key] * 10 ** rng.uniform(-1, 1, samples) for key in PARAMETER_FIELDS}
+    batch = calculate_mosfet_params_batch(data, params)
+
+    mismatches = []
+    for i in range(samples):
+        design = {key: float(data[key][i]) for key in NUMBER_FIELDS}
+        design["foc"] = [True] if data["foc"][i] else []
+        design_params = {key: float(params[key][i]) for key in PARAMETER_FIELDS}
+        try:
+            scalar = calculate_mosfet_params(design, design_params)
+        except (ZeroDivisionError, OverflowError):
+            continue
+        for other, path in ((batch_row(batch, i), "the batch engine"),
+                            (calculate_graph_values(design, design_params), "CALCULATION_GRAPH")):
+            mismatches.extend((i, key, scalar[key], other[key], path) for key in RESULT_FIELDS
+                              if type(scalar[key]) is not type(other[key]) or scalar[key] != other[key])
+    return mismatches
+
+class SweepResult:
+    """Outputs of a parameter sweep, labelled by axis name and coordinate values."""
+
+    def __init__(self, dims, coords, values):
+        self.dims = tuple(dims)
+        self.coords = coords
+        self.values = values
+
+    @property
+    def shape(self):
+        return tuple(len(self.coords[dim]) for dim in self.dims)
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+    def sel(self, **points):
+        """Pick the grid points closest to the given coordinates, dropping those axes."""
+        index = []
+        for dim in self.dims:
+            if dim in points:
+                coord = self.coords[dim].astype(float)
+                index.append(int(np.argmin(np.abs(coord - float(points[dim])))))
+            else:
+                index.append(slice(None))
+        dims = [dim for dim in self.dims if dim not in points]
+        return SweepResult(dims, {dim: self.coords[dim] for dim in dims},
+                           {name: value[tuple(index)] for name, value in self.values.items()})
+
+def grid_chunks(shape, chunk_size):
+    """Yield (start, stop, per-axis indices) for consecutive flat slices of a grid."""
+    total = int(np.prod(shape, dtype=np.int64))
+    for start in range(0, total, chunk_size):
+        stop = min(start + chunk_size, total)
+        yield start, stop, np.unravel_index(np.arange(start, stop), shape)
+
+def sweep_chunk(axes, base, indices, outputs):
+    """Evaluate one slice of a sweep grid and return the requested output columns."""
+    columns = dict(base)
+    for (name, values), index in zip(axes.items(), indices):
+        if isinstance(values, dict):
+            for key, column in values.items():
+                columns[key] = column[index]
+        else:
+            columns[name] = values[index]
+    results = calculate_mosfet_params_batch(columns, columns)
+    return {name: results[name] for name in outputs}
+
+def _sweep_axes(axes, base):
+    """Check sweep axis names and turn their value ranges into arrays.
+
+    An axis may also be a dict of equal-length columns that vary together, such as
+    the loss parameters of each part in a catalog.
+    """
+    known = set(INPUT_FIELDS) | set(PARAMETER_FIELDS)
+    checked = {}
+    swept = set()
+    for name, values in axes.items():
+        if isinstance(values, dict):
+            columns = {key: _foc_column(column) if key == "foc" else np.asarray(column)
+                       for key, column in values.items()}
+            if len({len(column) for column in columns.values()}) > 1:
+                raise ValueError(f"Columns of sweep axis {name} differ in length")
+            checked[name] = columns
+            swept.update(columns)
+        else:
+            checked[name] = _foc_column(values) if name == "foc" else np.asarray(values)
+            swept.add(name)
+    unknown = sorted(swept - known)
+    if unknown:
+        raise ValueError(f"Cannot sweep unknown field: {', '.join(unknown)}")
+    missing = [key for key in known if key not in base and key not in swept]
+    if missing:
+        raise ValueError(f"Base design is missing: {', '.join(sorted(missing))}")
+    return checked
+
+def _sweep_outputs(outputs):
+    """Check that every requested sweep output is a numeric result."""
+    unknown = [name for name in outputs if name not in RESULT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown sweep output: {', '.join(unknown)}")
+    labels = [name for name in outputs if name in LABEL_RESULTS]
+    if labels:
+        raise ValueError(f"Cannot sweep text results: {', '.join(labels)}; sweep outputs must be numeric")
+
+def _axis_length(values):
+    """Number of points along a sweep axis."""
+    if isinstance(values, dict):
+        return len(next(iter(values.values())))
+    return len(values)
+
+def _axis_coords(axes):
+    """Coordinate labels for each axis; linked axes are labelled by position."""
+    return {name: np.arange(_axis_length(values)) if isinstance(values, dict) else values
+            for name, values in axes.items()}
+
+def sweep(axes, base, outputs=SWEEP_OUTPUTS, chunk_size=65536):
+    """Evaluate the Cartesian grid of ``axes`` on top of a base design.
+
+    ``axes`` maps input fields or parameter keys to the values to sweep, and
+    ``base`` supplies every other field (DEFAULT_PARAMETERS holds both). The grid is
+    never built in full: flat slices of ``chunk_size`` points are expanded and
+    evaluated one at a time, straight into the output arrays.
+    """
+    _sweep_outputs(outputs)
+    axes = _sweep_axes(axes, base)
+    shape = tuple(_axis_length(values) for values in axes.values())
+    values = {name: np.empty(shape) for name in outputs}
+    flat = {name: value.reshape(-1) for name, value in values.items()}
+    for start, stop, indices in grid_chunks(shape, chunk_size):
+        for name, column in sweep_chunk(axes, base, indices, outputs).items():
+            flat[name][start:stop] = column
+    return SweepResult(axes.keys(), _axis_coords(axes), values)
+
+class SweepCancelled(Exception):
+    """Raised when a parallel sweep is cancelled before all chunks finish."""
+
+# Per-process sweep state, set once by _init_sweep_worker
+_worker_sweep = None
+
+def _init_sweep_worker(axes, base, outputs, shape, shared):
+    """Keep the sweep definition and shared output buffers in each worker process."""
+    global _worker_sweep
+    _worker_sweep = (axes, base, outputs, shape,
+                     {name: np.frombuffer(buffer, dtype=np.float64) for name, buffer in shared.items()})
+
+def _run_sweep_chunk(bounds):
+    """Evaluate flat grid points [start, stop) and write them straight into shared memory."""
+    axes, base, outputs, shape, flat = _worker_sweep
+    start, stop = bounds
+    indices = np.unravel_index(np.arange(start, stop), shape)
+    for name, column in sweep_chunk(axes, base, indices, outputs).items():
+        flat[name][start:stop] = column
+    return stop - start
+
+def parallel_sweep(axes, base, outputs=SWEEP_OUTPUTS, chunk_size=None, processes=None,
+                   progress=None, cancel=None):
+    """Run sweep() across a pool of worker processes.
+
+    Outputs live in shared memory that every worker writes its chunks into, so
+    only (start, stop) pairs and point counts cross process boundaries. Chunks are
+    handed out dynamically to keep all cores busy. ``progress(done, total)`` is
+    called as chunks complete, and setting the ``cancel`` event (any object with
+    ``is_set()``) stops the pool and raises SweepCancelled.
+    """
+    _sweep_outputs(outputs)
+    axes = _sweep_axes(axes, base)
+    shape = tuple(_axis_length(values) for values in axes.values())
+    total = int(np.prod(shape, dtype=np.int64))
+    processes = processes or multiprocessing.cpu_count()
+    if chunk_size is None:
+        # Several chunks per worker so uneven chunks still balance out
+        chunk_size = max(1024, min(65536, -(-total // (processes * 8))))
+    shared = {name: multiprocessing.RawArray("d", total) for name in outputs}
+
+    done = 0
+    pool = multiprocessing.Pool(processes, initializer=_init_sweep_worker,
+                                initargs=(axes, base, outputs, shape, shared))
+    try:
+        bounds = ((start, min(start + chunk_size, total)) for start in range(0, total, chunk_size))
+        for count in pool.imap_unordered(_run_sweep_chunk, bounds):
+            done += count
+            if progress is not None:
+                progress(done, total)
+            if cancel is not None and cancel.is_set():
+                raise SweepCancelled(f"Sweep cancelled after {done} of {total} points")
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+    values = {name: np.frombuffer(buffer, dtype=np.float64).reshape(shape) for name, buffer in shared.items()}
+    return SweepResult(axes.keys(), _axis_coords(axes), values)
+
+if __name__ == "__main__":
+    # Regression check that the batch engine and the graph still match the scalar function: mosfet_batch.py [SAMPLES]
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else CHECK_SAMPLES
+    mismatches = check_against_scalar(samples)
+    for design, key, scalar, other, path in mismatches[:20]:
+        print(f"Design {design}: {key} is {scalar!r} from calculate_mosfet_params, {other!r} from {path}",
+              file=sys.stderr)
+    print(f"{samples} designs checked, {len(mismatches)} mismatched results", file=sys.stderr)
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,272 @@
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import timeit
+
+# Script benchmarked unless --script names another version
+DEFAULT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mosfet_calculator_pywebio4.0.py")
+
+# Designs evaluated per call by the bulk benchmarks
+BULK_SIZE = 10000
+BATCH_SIZE = 100000
+
+# Seconds a simulated session may take before the benchmark gives up
+SESSION_TIMEOUT = 30.0
+
+# HTML that only the result view contains, in every version from 1.0 on; 1.0 has no footer to wait for
+RESULT_MARKER = 'class="info-card"'
+
+# Slowdown of a benchmark's median over the baseline that counts as a regression
+DEFAULT_THRESHOLD = 0.15
+
+def load_script(path):
+    """Load a calculator script by path; the file names are not importable module names."""
+    spec = importlib.util.spec_from_file_location("mosfet_calculator_bench_target", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def time_call(func, repeat=5):
+    """Median and best seconds per call of ``func`` over ``repeat`` auto-sized timing loops."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    runs = [total / number for total in timer.repeat(repeat, number)]
+    return {"median": statistics.median(runs), "min": min(runs), "calls": number * repeat}
+
+def form_data(module):
+    """The default design as the form submits it."""
+    data = dict(module.DEFAULT_PARAMETERS)
+    data["foc"] = [True] if data["foc"] else []
+    return data
+
+def render_function(module):
+    """A callable producing the results view HTML, or None when the script has no way to build it.
+
+    Scripts with render_results() are used as they are. Older scripts only have
+    display_results(), so their put_html calls are collected into a list instead.
+    """
+    data = form_data(module)
+    results = module.calculate_mosfet_params(data, module.DEFAULT_PARAMETERS)
+    if hasattr(module, "render_results"):
+        return lambda: module.render_results(data, results) + module.render_engineering_data(results)
+    if hasattr(module, "display_results"):
+        fragments = []
+
+        def render():
+            put_html = module.put_html
+            module.put_html = fragments.append
+            try:
+                fragments.clear()
+                module.display_results(data, results)
+                module.display_engineering_data(results)
+            finally:
+                module.put_html = put_html
+            return "".join(fragments)
+        return render
+    return None
+
+def bench_calculation(module, benchmarks):
+    """Time calculate_mosfet_params on one design and on a list of designs."""
+    params = module.DEFAULT_PARAMETERS
+    data = form_data(module)
+    benchmarks["calculate_scalar"] = time_call(lambda: module.calculate_mosfet_params(data, params))
+
+    designs = [dict(data, max_current=1.0 + i % 200, n_parallel=1 + i % 4) for i in range(BULK_SIZE)]
+    benchmarks["calculate_bulk_%d" % BULK_SIZE] = time_call(
+        lambda: [module.calculate_mosfet_params(design, params) for design in designs], repeat=3)
+
+    try:
+        import numpy as np
+        from mosfet_batch import PARAMETER_FIELDS, calculate_mosfet_params_batch
+    except ImportError:
+        return
+    # Scripts older than the batch engine have a smaller parameter set
+    if any(key not in params for key in PARAMETER_FIELDS):
+        return
+    columns = dict(data, foc=True, max_current=1.0 + np.arange(BATCH_SIZE) % 200,
+                   n_parallel=1 + np.arange(BATCH_SIZE) % 4)
+    benchmarks["calculate_batch_%d" % BATCH_SIZE] = time_call(
+        lambda: calculate_mosfet_params_batch(columns, params), repeat=3)
+
+def bench_rendering(module, benchmarks):
+    """Time building the result and engineering data HTML, with and without cached fragments."""
+    render = render_function(module)
+    if render is None:
+        return
+    benchmarks["render_results"] = time_call(render)
+    render_card = getattr(module, "render_card", None)
+    if hasattr(render_card, "cache_clear"):
+        def render_cold():
+            render_card.cache_clear()
+            return render()
+        benchmarks["render_results_cold"] = time_call(render_cold)
+
+async def run_session(url):
+    """Open a session, submit the form with its default values if it asks for one, and wait for the first result output."""
+    from tornado.websocket import websocket_connect
+    connection = await websocket_connect(url)
+    try:
+        while True:
+            message = await connection.read_message()
+            if message is None:
+                raise RuntimeError("Session closed before the results were rendered")
+            commands = json.loads(message)
+            for command in commands if isinstance(commands, list) else [commands]:
+                if command["command"] == "input_group":
+                    connection.write_message(json.dumps({
+                        "event": "from_submit", "task_id": command["task_id"],
+                        "data": submitted_values(command["spec"])}))
+                elif command["command"] == "output" and contains_html(command["spec"], RESULT_MARKER):
+                    return
+    finally:
+        connection.close()
+
+async def run_live_updates(url, edits):
+    """Open a session and time ``edits`` phase current changes, each until its new values are patched into the page."""
+    from tornado.websocket import websocket_connect
+    connection = await websocket_connect(url)
+    try:
+        callback_id = None
+        while callback_id is None:
+            message = await connection.read_message()
+            if message is None:
+                raise RuntimeError("Session closed before the input panel was ready")
+            commands = json.loads(message)
+            for command in commands if isinstance(commands, list) else [commands]:
+                if command["command"] == "pin_onchange" and command["spec"]["name"] == "max_current":
+                    callback_id = command["spec"]["callback_id"]
+
+        runs = []
+        for i in range(edits):
+            start = time.perf_counter()
+            connection.write_message(json.dumps({"event": "callback", "task_id": callback_id,
+                                                 "data": {"value": 50.0 + i}}))
+            patched = False
+            while not patched:
+                message = await connection.read_message()
+                if message is None:
+                    raise RuntimeError("Session closed before the values were patched")
+                commands = json.loads(message)
+                patched = any(command["command"] == "run_script"
+                              for command in (commands if isinstance(commands, list) else [commands]))
+            runs.append(time.perf_counter() - start)
+        return runs
+    finally:
+        connection.close()
+
+def contains_html(spec, text):
+    """Whether any HTML content in an output spec, including nested widgets, contains ``text``."""
+    if isinstance(spec, dict):
+        return any(contains_html(value, text) for value in spec.values())
+    if isinstance(spec, list):
+        return any(contains_html(value, text) for value in spec)
+    return isinstance(spec, str) and text in spec
+
+def submitted_values(spec):
+    """The values a user gets by submitting an input group without changing any field."""
+    values = {}
+    for field in spec["inputs"]:
+        if field["type"] == "checkbox":
+            values[field["name"]] = [option["value"] for option in field["options"] if option.get("selected")]
+        else:
+            values[field["name"]] = field.get("value")
+    return values
+
+def bench_session(module, benchmarks, sessions=20):
+    """Time full sessions from form submit to rendered results against a local server."""
+    if not hasattr(module, "mosfet_calculator"):
+        return
+    # Older scripts have no socket-bound server helper; the current script's serves any version
+    server = module if hasattr(module, "serve_app") else load_script(DEFAULT_SCRIPT)
+    sockets, port = server.bind_server_sockets(0)
+    thread = threading.Thread(target=server.serve_app, args=(module.mosfet_calculator, sockets), daemon=True)
+    thread.start()
+    server.wait_for_server("localhost", port, thread)
+
+    url = f"ws://localhost:{port}/?app=index"
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(asyncio.wait_for(run_session(url), SESSION_TIMEOUT))
+        runs = []
+        for _ in range(sessions):
+            start = time.perf_counter()
+            loop.run_until_complete(asyncio.wait_for(run_session(url), SESSION_TIMEOUT))
+            runs.append(time.perf_counter() - start)
+        # Scripts with the live input panel also patch results as the inputs change
+        live_runs = None
+        if hasattr(module, "LIVE_INPUT_FIELDS"):
+            live_runs = loop.run_until_complete(asyncio.wait_for(run_live_updates(url, sessions), SESSION_TIMEOUT))
+    finally:
+        loop.close()
+    benchmarks["session_round_trip"] = {"median": statistics.median(runs), "min": min(runs), "calls": sessions}
+    if live_runs:
+        benchmarks["live_update_round_trip"] = {"median": statistics.median(live_runs), "min": min(live_runs),
+                                                "calls": len(live_runs)}
+
+def compare(benchmarks, baseline, threshold):
+    """Benchmarks whose median is more than ``threshold`` slower than in the baseline."""
+    regressions = []
+    for name, result in benchmarks.items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if previous is None:
+            continue
+        change = result["median"] / previous["median"] - 1
+        result["change"] = change
+        if change > threshold:
+            regressions.append((name, change))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark calculation, rendering and session round-trips.")
+    parser.add_argument("--script", default=DEFAULT_SCRIPT, help="Calculator script to benchmark (default: 4.0)")
+    parser.add_argument("--only", action="append", choices=["calculation", "rendering", "session"],
+                        help="Run only these groups (repeatable)")
+    parser.add_argument("-o", "--output", help="Write the JSON results to this file as well as stdout")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown before failing, as a fraction (default 0.15)")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    module = load_script(args.script)
+    groups = args.only or ["calculation", "rendering", "session"]
+    runners = {"calculation": bench_calculation, "rendering": bench_rendering, "session": bench_session}
+    benchmarks = {}
+    errors = {}
+    for group in groups:
+        if group != "session" and not hasattr(module, "calculate_mosfet_params"):
+            continue
+        # A group that fails, such as a session timing out, still leaves the other groups' results
+        try:
+            runners[group](module, benchmarks)
+        except Exception as e:
+            errors[group] = f"{type(e).__name__}: {e}".rstrip(": ")
+            print(f"Benchmark group {group} failed: {errors[group]}", file=sys.stderr)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(benchmarks, json.load(f), args.threshold)
+
+    report = {"script": os.path.basename(args.script), "python": sys.version.split()[0],
+              "benchmarks": benchmarks}
+    if errors:
+        report["errors"] = errors
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    for name, change in regressions:
+        print(f"Regression: {name} is {change:.0%} slower than the baseline", file=sys.stderr)
+    return 1 if regressions or errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,40 +1,25 @@
 import math
-import pywebio
-from pywebio.input import input, FLOAT, checkbox
-from pywebio.output import put_html, clear, put_buttons, put_row, put_column, put_error, put_text
-from pywebio import start_server
-import webview
-import socket
+import argparse
+import atexit
+import bisect
+import csv
+import functools
+import itertools
+import json
 import sys
-import webbrowser
+import os
+import signal
 import threading
 import time
-
-# Constants for MOSFET calculations
-DEFAULT_PARAMETERS = {
-    "max_power": 2700.0,  # Motor power in Watts
-    "motor_kv": 190.0,    # Motor KV (RPM/V)
-    "max_current": 75.0,  # Phase RMS current in Amps
-    "v_max": 60.0,        # Maximum voltage in Volts
-    "foc": True,          # Default to FOC control
-    "n_parallel": 2,      # Number of parallel MOSFETs
-    "k_margin": 1.5,      # Voltage margin factor
-    "k_derate": 1.3,      # Current derating factor
-    "D": 0.8,             # Duty cycle
-    "f_sw": 30000,        # Switching frequency in Hz
-    "t_r_f": 100e-9,     # Rise/fall time in seconds
-    "Qg": 100e-9,         # Gate charge in Coulombs
-    "Vgs": 10,            # Gate-source voltage in Volts
-    "Rds_on_assumed": 0.0015,  # Assumed Rds(on) in Ohms
-    "Pd_max": 50,          # Maximum power dissipation in Watts
-    "Ta": 25.0,           # Ambient temperature in °C
-    "Rth": 2.0,           # Assumed thermal resistance in °C/W
-    "alpha": 0.007        # Temperature coefficient for Rds(on) per °C
-}
-
-# CSS Styles
+import traceback
+from collections import OrderedDict
+from contextlib import nullcontext
+from html import escape
+from mosfet_core import (DEFAULT_PARAMETERS, NUMBER_FIELDS, RESULT_FIELDS, IncrementalCalculation,
+                         calculate_graph_values, calculate_mosfet_params, parse_batch_row, validate_inputs)
+
+# CSS Styles, served once with the page rather than over the session websocket
 CUSTOM_CSS = """
-<style>
     /* Global styles - Dark mode optimized */
     body {
         background: #1a1a1a;
@@ -369,282 +354,478 @@ CUSTOM_CSS = """
     .data-item-white p {
         color: #000000 !important;
     }
-</style>
 """
 
-def add_custom_styles():
-    """Apply custom CSS styles for dark mode and UI consistency."""
-    put_html(CUSTOM_CSS)
-
-def create_header():
-    """Create the page header with title and subtitle."""
-    put_html("""
+# Page header with title and subtitle
+HEADER_HTML = """
         <h1>🔧 MOSFET Calculator</h1>
         <div class="subtitle">Professional-grade MOSFET selection tool for VESC FOC</div>
-    """)
-
-def validate_inputs(data):
-    """Validate user inputs to ensure they are positive and reasonable."""
-    for key in ["max_power", "motor_kv", "max_current", "v_max", "n_parallel"]:
-        if data[key] <= 0:
-            raise ValueError(f"{key.replace('_', ' ').title()} must be positive.")
-    return data
-
-def calculate_mosfet_params(data, params):
-    """Perform MOSFET calculations based on input data and fixed parameters."""
-    max_power = data["max_power"]
-    motor_kv = data["motor_kv"]
-    max_current = data["max_current"]
-    v_max = data["v_max"]
-    foc = data["foc"][0] if data["foc"] else False
-    n_parallel = data["n_parallel"]
-
-    # Efficiency based on control type
-    eta = 0.95 if foc else 0.90
-
-    # Battery-side DC current
-    I_phase_rms = max_current
-    I_cont = I_phase_rms * math.sqrt(3) / (math.sqrt(2) * eta)
-    I_cont_power = max_power / (v_max * eta)
-
-    # Per-MOSFET current
-    I_mos_rms = I_phase_rms / n_parallel
-    I_mos_peak = (I_phase_rms * math.sqrt(2)) / n_parallel
-    I_mos_min = I_mos_rms * params["k_derate"]
-
-    # Voltage requirements (considering BEMF)
-    max_rpm = motor_kv * v_max
-    bemf_voltage = max_rpm / motor_kv * 0.9
-    Vds_min = max(v_max, bemf_voltage) * params["k_margin"]
-
-    # Maximum Rds(on)
-    Rds_on_max = (params["Pd_max"] / (I_mos_rms**2 * params["D"])) * 1000
-
-    # Power dissipation
-    P_cond = I_mos_rms**2 * params["Rds_on_assumed"] * params["D"]
-    P_sw = (v_max * I_mos_peak * params["t_r_f"] * params["f_sw"]) / 2 + (params["Qg"] * params["Vgs"] * params["f_sw"])
-    P_total = P_cond + P_sw
-
-    # Cooling recommendation
-    cooling = "被動散熱" if P_total < 30 else "強制風冷"
-
-    # New calculations
-    Tj = params["Ta"] + P_total * params["Rth"]
-    Rds_on_corrected = params["Rds_on_assumed"] * (1 + params["alpha"] * (Tj - 25))
-    Pd_rds_25 = I_mos_rms**2 * params["Rds_on_assumed"] * params["D"]
-    Pd_rds_100 = I_mos_rms**2 * params["Rds_on_assumed"] * (1 + params["alpha"] * (100 - 25)) * params["D"]
+    """
 
-    return {
-        "I_cont": I_cont,
-        "I_cont_power": I_cont_power,
-        "I_phase_rms": I_phase_rms,
-        "I_mos_rms": I_mos_rms,
-        "I_mos_peak": I_mos_peak,
-        "I_mos_min": I_mos_min,
-        "max_rpm": max_rpm,
-        "bemf_voltage": bemf_voltage,
-        "Vds_min": Vds_min,
-        "Rds_on_max": Rds_on_max,
-        "P_total": P_total,
-        "P_cond": P_cond,
-        "P_sw": P_sw,
-        "cooling": cooling,
-        "control_type": "FOC" if foc else "BLDC",
-        "eta": eta,
-        "n_parallel": n_parallel,
-        "Tj": Tj,
-        "Rds_on_corrected": Rds_on_corrected,
-        "Pd_rds_25": Pd_rds_25,
-        "Pd_rds_100": Pd_rds_100
-    }
+# Page footer
+FOOTER_HTML = """
+        <div class="footer">
+            <p style="margin: 0; font-size: 14px; font-weight: 500;">🚀 MOSFET Calculator v2.0</p>
+            <p style="margin: 4px 0 0 0; font-size: 12px;">Professional motor controller design tool | Powered by PyWebIO</p>
+        </div>
+        """
 
-def display_results(data, results):
-    """Display calculation results in organized cards."""
+# Widget template that stacks several outputs into one websocket message
+STACK_TEMPLATE = "<div>{{#contents}}{{& pywebio_output_parse}}{{/contents}}</div>"
+
+def create_header():
+    """Create the page header with title and subtitle."""
+    from pywebio.output import put_html
+    put_html(HEADER_HTML)
+
+class CalculationCache:
+    """Bounded LRU cache of calculation results, shared by every session in the process.
+
+    Entries hold every graph value of a design, so a session can start its
+    incremental calculation from one, and are keyed on the normalized form inputs. The whole cache is dropped
+    whenever the parameter set it was filled with changes, so results computed
+    from old DEFAULT_PARAMETERS are never served.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.params_key = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def make_key(data):
+        """Normalize form data so equal designs share a key (75 and 75.0, [True] and True)."""
+        foc = data["foc"][0] if isinstance(data["foc"], (list, tuple)) and data["foc"] else data["foc"]
+        return tuple(float(data[key]) for key in NUMBER_FIELDS) + (bool(foc),)
+
+    @staticmethod
+    def make_params_key(params):
+        """Snapshot of a parameter set; compared in full, since equal hashes do not mean equal parameters."""
+        return tuple(sorted(params.items()))
+
+    def get(self, data, params):
+        """Return cached results for these inputs and parameters, calculating them on a miss."""
+        values = self.get_values(data, params)
+        return {key: values[key] for key in RESULT_FIELDS}
+
+    def get_values(self, data, params):
+        """Return the cached graph values for these inputs and parameters, calculating them on a miss.
+
+        The dict is shared with later lookups, so callers must copy it before changing it.
+        """
+        key = self.make_key(data)
+        params_key = self.make_params_key(params)
+        with self.lock:
+            if params_key != self.params_key:
+                self.entries.clear()
+                self.params_key = params_key
+            values = self.entries.get(key)
+            if values is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return values
+            self.misses += 1
+
+        values = calculate_graph_values(data, params)
+        with self.lock:
+            if params_key == self.params_key:
+                self.entries[key] = values
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+        return values
+
+    def clear(self):
+        """Drop every entry; the counters keep running."""
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """Hit, miss and eviction counters plus the current size and hit rate."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+calculation_cache = CalculationCache(int(os.environ.get("MOSFET_CACHE_SIZE", "256")))
+
+# Upper bounds of the latency histogram buckets, in milliseconds; slower samples land in an overflow bucket
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+class LatencyHistogram:
+    """Durations counted into fixed buckets, with their count, sum and maximum."""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile, capped at the maximum seen."""
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS + (self.max,), self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max
+        }
+
+class _Span:
+    """Times one stage and records it in a StageTimer on exit."""
+
+    __slots__ = ("timer", "stage", "start")
+
+    def __init__(self, timer, stage):
+        self.timer = timer
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.record(self.stage, (time.perf_counter() - self.start) * 1000)
+        return False
+
+# Shared do-nothing span handed out while timing is disabled
+_NO_SPAN = nullcontext()
+
+class StageTimer:
+    """Per-stage latency histograms for calculator sessions.
+
+    Stages are timed with ``with stage_timer.span("name"):``. While disabled, span()
+    returns a shared no-op context manager, so instrumented code costs one method
+    call per stage. Enable it with MOSFET_TIMING=1, or with MOSFET_TIMING_LOG=path
+    to also append the summary to a log file at exit.
+    """
+
+    def __init__(self, enabled=False, log_path=None):
+        self.enabled = enabled or bool(log_path)
+        self.log_path = log_path
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def span(self, stage):
+        return _Span(self, stage) if self.enabled else _NO_SPAN
+
+    def record(self, stage, ms):
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = LatencyHistogram()
+            histogram.add(ms)
+
+    def snapshot(self):
+        """Summary of every stage seen so far, keyed by stage name."""
+        with self.lock:
+            return {stage: histogram.summary() for stage, histogram in self.histograms.items()}
+
+    def dump(self, file=None):
+        """Write a per-stage latency table to ``file`` (stderr by default)."""
+        file = file or sys.stderr
+        print(f"Stage timings at {time.strftime('%Y-%m-%d %H:%M:%S')}", file=file)
+        print(f"{'stage':<20}{'count':>8}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}", file=file)
+        for stage, summary in sorted(self.snapshot().items()):
+            print(f"{stage:<20}{summary['count']:>8}{summary['mean_ms']:>10.2f}{summary['p50_ms']:>10.2f}"
+                  f"{summary['p95_ms']:>10.2f}{summary['p99_ms']:>10.2f}{summary['max_ms']:>10.2f}", file=file)
+
+    def write_log(self):
+        """Append the current table to the log file, if one is configured."""
+        if self.log_path and self.histograms:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                self.dump(f)
+
+stage_timer = StageTimer(os.environ.get("MOSFET_TIMING", "") not in ("", "0"), os.environ.get("MOSFET_TIMING_LOG"))
+atexit.register(stage_timer.write_log)
+
+class ServerMetrics:
+    """Counters behind the Prometheus /metrics endpoint of the PyWebIO server."""
+
+    def __init__(self):
+        self.active_sessions = 0
+        self.sessions = 0
+        self.validations = 0
+        self.validation_errors = 0
+        self.calculations = 0
+        self.calculation_latency = LatencyHistogram()
+        self.messages_sent = 0
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+
+    def session_opened(self):
+        with self.lock:
+            self.active_sessions += 1
+            self.sessions += 1
+
+    def session_closed(self):
+        with self.lock:
+            self.active_sessions -= 1
+
+    def message_sent(self, size):
+        with self.lock:
+            self.messages_sent += 1
+            self.bytes_sent += size
+
+    def validated(self, ok):
+        with self.lock:
+            self.validations += 1
+            if not ok:
+                self.validation_errors += 1
+
+    def calculated(self, ms):
+        with self.lock:
+            self.calculations += 1
+            self.calculation_latency.add(ms)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        cache = calculation_cache.stats()
+        with self.lock:
+            lines = []
+
+            def metric(name, kind, help_text, value):
+                lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"])
+
+            metric("mosfet_active_sessions", "gauge", "Open PyWebIO sessions.", self.active_sessions)
+            metric("mosfet_sessions_total", "counter", "PyWebIO sessions opened.", self.sessions)
+            metric("mosfet_validations_total", "counter", "Submitted forms checked by validate_inputs.", self.validations)
+            metric("mosfet_validation_errors_total", "counter", "Submitted forms rejected by validate_inputs.",
+                   self.validation_errors)
+            metric("mosfet_calculations_total", "counter", "Calculations run for sessions.", self.calculations)
+            metric("mosfet_websocket_messages_sent_total", "counter", "Websocket messages sent to browsers.",
+                   self.messages_sent)
+            metric("mosfet_websocket_bytes_sent_total", "counter", "Websocket payload bytes sent to browsers.",
+                   self.bytes_sent)
+            metric("mosfet_cache_hits_total", "counter", "Calculation cache hits.", cache["hits"])
+            metric("mosfet_cache_misses_total", "counter", "Calculation cache misses.", cache["misses"])
+            metric("mosfet_cache_evictions_total", "counter", "Calculation cache evictions.", cache["evictions"])
+
+            # Histogram buckets are cumulative and in seconds
+            name = "mosfet_calculation_duration_seconds"
+            histogram = self.calculation_latency
+            lines.extend([f"# HELP {name} Time to calculate a submitted design.", f"# TYPE {name} histogram"])
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS_MS, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{le="{bound / 1000:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{le="+Inf"}} {histogram.count}')
+            lines.append(f"{name}_sum {histogram.total / 1000:.9g}")
+            lines.append(f"{name}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+server_metrics = ServerMetrics()
+
+# Result card templates, filled by slot name with values already rounded for display. Each value sits in a
+# data-slot="card.slot" element so live updates can replace it in place.
+RESULT_CARD_TEMPLATES = {
     # Input parameters card
-    put_html('<div class="info-card">')
-    put_html('<div class="info-card-header">📋 Input Parameters</div>')
-    put_html(f'''
+    "inputs": """
+    <div class="info-card">
+    <div class="info-card-header">📋 Input Parameters</div>
     <div class="data-grid">
         <div class="data-item">
             <div class="data-label">Motor Power</div>
-            <div class="data-value">{data["max_power"]} W</div>
+            <div class="data-value"><span data-slot="inputs.max_power">{max_power}</span> W</div>
         </div>
         <div class="data-item">
             <div class="data-label">KV Value</div>
-            <div class="data-value">{data["motor_kv"]} RPM/V</div>
+            <div class="data-value"><span data-slot="inputs.motor_kv">{motor_kv}</span> RPM/V</div>
         </div>
         <div class="data-item">
             <div class="data-label">Phase RMS Current</div>
-            <div class="data-value">{data["max_current"]} A</div>
+            <div class="data-value"><span data-slot="inputs.max_current">{max_current}</span> A</div>
         </div>
         <div class="data-item">
             <div class="data-label">Maximum Voltage</div>
-            <div class="data-value">{data["v_max"]} V</div>
+            <div class="data-value"><span data-slot="inputs.v_max">{v_max}</span> V</div>
         </div>
         <div class="data-item">
             <div class="data-label">MOSFET Parallel Count</div>
-            <div class="data-value">{data["n_parallel"]}</div>
+            <div class="data-value"><span data-slot="inputs.n_parallel">{n_parallel}</span></div>
         </div>
     </div>
-    <p style="margin: 8px 0 0 0; color: #b0b0b0; font-size: 13px;">Control Mode: {results["control_type"]}</p>
-    ''')
-    put_html('</div>')
+    <p style="margin: 8px 0 0 0; color: #b0b0b0; font-size: 13px;">Control Mode: <span data-slot="inputs.control_type">{control_type}</span></p>
+    </div>
+    """,
 
     # Current analysis card
-    put_html('<div class="info-card">')
-    put_html('<div class="info-card-header">⚡ Current Analysis</div>')
-    put_html(f'''
+    "current": """
+    <div class="info-card">
+    <div class="info-card-header">⚡ Current Analysis</div>
     <div class="data-grid">
         <div class="data-item">
             <div class="data-label">Battery Current</div>
-            <div class="data-value">{round(results["I_cont"], 1)} A</div>
+            <div class="data-value"><span data-slot="current.I_cont">{I_cont}</span> A</div>
         </div>
         <div class="data-item">
             <div class="data-label">Power-Derived Current</div>
-            <div class="data-value">{round(results["I_cont_power"], 1)} A</div>
+            <div class="data-value"><span data-slot="current.I_cont_power">{I_cont_power}</span> A</div>
         </div>
         <div class="data-item">
             <div class="data-label">Phase RMS Current</div>
-            <div class="data-value">{round(results["I_phase_rms"], 1)} A</div>
+            <div class="data-value"><span data-slot="current.I_phase_rms">{I_phase_rms}</span> A</div>
         </div>
         <div class="data-item">
             <div class="data-label">Per-MOSFET RMS Current</div>
-            <div class="data-value">{round(results["I_mos_rms"], 1)} A</div>
+            <div class="data-value"><span data-slot="current.I_mos_rms">{I_mos_rms}</span> A</div>
         </div>
     </div>
-    ''')
-    put_html('</div>')
+    </div>
+    """,
 
     # Additional current calculations card
-    put_html('<div class="info-card">')
-    put_html('<div class="info-card-header">🔍 Additional Current Calculations</div>')
-    put_html(f'''
+    "current_extra": """
+    <div class="info-card">
+    <div class="info-card-header">🔍 Additional Current Calculations</div>
     <div class="data-grid">
         <div class="data-item">
             <div class="data-label">Per-MOSFET Peak Current</div>
-            <div class="data-value">{round(results["I_mos_peak"], 1)} A</div>
+            <div class="data-value"><span data-slot="current_extra.I_mos_peak">{I_mos_peak}</span> A</div>
         </div>
         <div class="data-item">
             <div class="data-label">Per-MOSFET Minimum Current (Derated)</div>
-            <div class="data-value">{round(results["I_mos_min"], 1)} A</div>
+            <div class="data-value"><span data-slot="current_extra.I_mos_min">{I_mos_min}</span> A</div>
         </div>
         <div class="data-item">
             <div class="data-label">System Efficiency</div>
-            <div class="data-value">{round(results["eta"] * 100, 1)} %</div>
+            <div class="data-value"><span data-slot="current_extra.eta">{eta}</span> %</div>
         </div>
     </div>
-    ''')
-    put_html('</div>')
+    </div>
+    """,
 
     # BEMF analysis card
-    put_html('<div class="info-card">')
-    put_html('<div class="info-card-header">🔄 BEMF Analysis</div>')
-    put_html(f'''
+    "bemf": """
+    <div class="info-card">
+    <div class="info-card-header">🔄 BEMF Analysis</div>
     <div class="data-grid">
         <div class="data-item">
             <div class="data-label">Maximum RPM</div>
-            <div class="data-value">{round(results["max_rpm"], 0)} RPM</div>
+            <div class="data-value"><span data-slot="bemf.max_rpm">{max_rpm}</span> RPM</div>
         </div>
         <div class="data-item">
             <div class="data-label">Back EMF</div>
-            <div class="data-value">{round(results["bemf_voltage"], 1)} V</div>
+            <div class="data-value"><span data-slot="bemf.bemf_voltage">{bemf_voltage}</span> V</div>
         </div>
     </div>
-    ''')
-    put_html('</div>')
+    </div>
+    """,
 
     # MOSFET specifications card
-    put_html('<div class="info-card">')
-    put_html('<div class="info-card-header">🔧 MOSFET Specifications</div>')
-    put_html(f'''
+    "specifications": """
+    <div class="info-card">
+    <div class="info-card-header">🔧 MOSFET Specifications</div>
     <div style="margin: 12px 0;">
         <div style="display: flex; justify-content: space-between; align-items: center; margin: 8px 0; padding: 8px 12px; background: #3a3a3a; border-radius: 6px;" class="white-text">
             <span style="color: #ffffff;">Vds Rating</span>
-            <span class="highlight">> {round(results["Vds_min"], 1)} V</span>
+            <span class="highlight">> <span data-slot="specifications.Vds_min">{Vds_min}</span> V</span>
         </div>
         <div style="display: flex; justify-content: space-between; align-items: center; margin: 8px 0; padding: 8px 12px; background: #3a3a3a; border-radius: 6px;" class="white-text">
             <span style="color: #ffffff;">Id Current</span>
-            <span class="highlight">> {round(results["I_mos_rms"] * DEFAULT_PARAMETERS["k_derate"], 1)} A</span>
+            <span class="highlight">> <span data-slot="specifications.Id_min">{Id_min}</span> A</span>
         </div>
         <div style="display: flex; justify-content: space-between; align-items: center; margin: 8px 0; padding: 8px 12px; background: #3a3a3a; border-radius: 6px;" class="white-text">
             <span style="color: #ffffff;">Rds(on) Resistance</span>
-            <span class="highlight">< {round(results["Rds_on_max"], 2)} mΩ</span>
+            <span class="highlight">< <span data-slot="specifications.Rds_on_max">{Rds_on_max}</span> mΩ</span>
         </div>
     </div>
-    ''')
-    put_html('</div>')
+    </div>
+    """,
 
     # Power dissipation analysis card
-    put_html('<div class="info-card">')
-    put_html('<div class="info-card-header">🔥 Power Dissipation Analysis</div>')
-    put_html(f'''
+    "power": """
+    <div class="info-card">
+    <div class="info-card-header">🔥 Power Dissipation Analysis</div>
     <div class="data-grid">
         <div class="data-item">
             <div class="data-label">Single MOSFET Power</div>
-            <div class="data-value">{round(results["P_total"], 2)} W</div>
+            <div class="data-value"><span data-slot="power.P_total">{P_total}</span> W</div>
         </div>
         <div class="data-item">
-            <div class="data-label">Total Heat ({6 * results["n_parallel"]} MOSFETs)</div>
-            <div class="data-value">{round(results["P_total"] * 6 * results["n_parallel"], 2)} W</div>
+            <div class="data-label">Total Heat (<span data-slot="power.mosfet_count">{mosfet_count}</span> MOSFETs)</div>
+            <div class="data-value"><span data-slot="power.P_heat">{P_heat}</span> W</div>
         </div>
         <div class="data-item">
             <div class="data-label">Conduction Loss</div>
-            <div class="data-value">{round(results["P_cond"], 2)} W</div>
+            <div class="data-value"><span data-slot="power.P_cond">{P_cond}</span> W</div>
         </div>
         <div class="data-item">
             <div class="data-label">Switching Loss</div>
-            <div class="data-value">{round(results["P_sw"], 2)} W</div>
+            <div class="data-value"><span data-slot="power.P_sw">{P_sw}</span> W</div>
         </div>
     </div>
-    <p style="margin: 12px 0 0 0; color: #b0b0b0; font-size: 13px;">Cooling Recommendation: {results["cooling"]}</p>
-    ''')
-    put_html('</div>')
-
-def display_engineering_data(results):
-    """Display engineering data with 20% margin."""
-    Vds_eng = results["Vds_min"] * 1.2
-    Id_eng = results["I_mos_rms"] * DEFAULT_PARAMETERS["k_derate"] * 1.2
-    Rds_on_eng = results["Rds_on_max"] * 0.8
+    <p style="margin: 12px 0 0 0; color: #b0b0b0; font-size: 13px;">Cooling Recommendation: <span data-slot="power.cooling">{cooling}</span></p>
+    </div>
+    """,
 
-    put_html('<div class="info-card engineering-data" style="border: 1px solid #FF9800;">')
-    put_html('<div class="info-card-header" style="background: #FF9800;">🛠️ Engineering Data (20% Margin)</div>')
-    put_html(f'''
+    # Engineering data card with 20% margin
+    "engineering": """
+    <div class="info-card engineering-data" style="border: 1px solid #FF9800;">
+    <div class="info-card-header" style="background: #FF9800;">🛠️ Engineering Data (20% Margin)</div>
     <div style="margin: 16px 0;">
         <h4 style="color: #ffffff; margin: 0 0 12px 0; font-size: 15px;">Conservative Design Specifications:</h4>
         <div style="display: flex; justify-content: space-between; align-items: center; margin: 8px 0; padding: 8px 12px; background: #3a3a3a; border-radius: 6px;">
             <span style="color: #b0b0b0;">Vds Rating</span>
-            <span class="highlight">> {round(Vds_eng, 1)} V</span>
+            <span class="highlight">> <span data-slot="engineering.Vds_eng">{Vds_eng}</span> V</span>
         </div>
         <div style="display: flex; justify-content: space-between; align-items: center; margin: 8px 0; padding: 8px 12px; background: #3a3a3a; border-radius: 6px;">
             <span style="color: #b0b0b0;">Id Current</span>
-            <span class="highlight">> {round(Id_eng, 1)} A</span>
+            <span class="highlight">> <span data-slot="engineering.Id_eng">{Id_eng}</span> A</span>
         </div>
         <div style="display: flex; justify-content: space-between; align-items: center; margin: 8px 0; padding: 8px 12px; background: #3a3a3a; border-radius: 6px;">
             <span style="color: #b0b0b0;">Rds(on) Resistance</span>
-            <span class="highlight">< {round(Rds_on_eng, 2)} mΩ</span>
+            <span class="highlight">< <span data-slot="engineering.Rds_on_eng">{Rds_on_eng}</span> mΩ</span>
         </div>
     </div>
     <div style="margin: 16px 0;">
         <h4 style="color: #ffffff; margin: 0 0 12px 0; font-size: 15px;">Additional Calculations:</h4>
         <div style="display: flex; justify-content: space-between; align-items: center; margin: 8px 0; padding: 8px 12px; background: #3a3a3a; border-radius: 6px;">
             <span style="color: #b0b0b0;">Tj (°C)</span>
-            <span class="highlight">{round(results["Tj"], 1)} °C</span>
+            <span class="highlight"><span data-slot="engineering.Tj">{Tj}</span> °C</span>
         </div>
         <div style="display: flex; justify-content: space-between; align-items: center; margin: 8px 0; padding: 8px 12px; background: #3a3a3a; border-radius: 6px;">
             <span style="color: #b0b0b0;">RDS(on) Actual</span>
-            <span class="highlight">{round(DEFAULT_PARAMETERS["Rds_on_assumed"] * 1000, 2)} mΩ</span>
+            <span class="highlight"><span data-slot="engineering.Rds_on_actual">{Rds_on_actual}</span> mΩ</span>
         </div>
         <div style="display: flex; justify-content: space-between; align-items: center; margin: 8px 0; padding: 8px 12px; background: #3a3a3a; border-radius: 6px;">
             <span style="color: #b0b0b0;">RDS(on) Corrected</span>
-            <span class="highlight">{round(results["Rds_on_corrected"] * 1000, 2)} mΩ</span>
+            <span class="highlight"><span data-slot="engineering.Rds_on_corrected">{Rds_on_corrected}</span> mΩ</span>
         </div>
         <div style="display: flex; justify-content: space-between; align-items: center; margin: 8px 0; padding: 8px 12px; background: #3a3a3a; border-radius: 6px;">
             <span style="color: #b0b0b0;">PD(RDS(on), TC=25°C)</span>
-            <span class="highlight">{round(results["Pd_rds_25"], 2)} W</span>
+            <span class="highlight"><span data-slot="engineering.Pd_rds_25">{Pd_rds_25}</span> W</span>
         </div>
         <div style="display: flex; justify-content: space-between; align-items: center; margin: 8px 0; padding: 8px 12px; background: #3a3a3a; border-radius: 6px;">
             <span style="color: #b0b0b0;">PD(RDS(on), TC=100°C)</span>
-            <span class="highlight">{round(results["Pd_rds_100"], 2)} W</span>
+            <span class="highlight"><span data-slot="engineering.Pd_rds_100">{Pd_rds_100}</span> W</span>
         </div>
         <p style="color: #b0b0b0; font-size: 13px; margin-top: 8px;">Tj 計算是假設理想散熱，僅供參考</p>
     </div>
@@ -661,133 +842,434 @@ def display_engineering_data(results):
         <h4 style="color: #ffffff; margin: 0 0 12px 0; font-size: 15px;">Notes:</h4>
         <div class="data-item-white">
             <p style="margin: 4px 0; color: #2E7D32; font-size: 13px;">✅ Data includes 20% safety margin</p>
-            <p style="margin: 4px 0; color: #2E7D32; font-size: 13px;">✅ Suitable for VESC {results["control_type"]} mode</p>
+            <p style="margin: 4px 0; color: #2E7D32; font-size: 13px;">✅ Suitable for VESC <span data-slot="engineering.control_type">{control_type}</span> mode</p>
             <p style="margin: 4px 0; color: #E65100; font-size: 13px;">⚠️ Perform thermal testing before deployment</p>
         </div>
     </div>
-    ''')
-    put_html('</div>')
+    </div>
+    """
+}
 
-def find_free_port(start_port=8080):
-    """Find an available port starting from the given port."""
-    port = start_port
-    while True:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+# Bound formatters for each card, built once at import
+CARD_FORMATTERS = {name: template.format for name, template in RESULT_CARD_TEMPLATES.items()}
+
+@functools.lru_cache(maxsize=4096, typed=True)
+def render_card(name, **slots):
+    """Fill one card template; repeated display values reuse the cached HTML fragment."""
+    return CARD_FORMATTERS[name](**slots)
+
+def result_card_slots(data, results):
+    """Display values of each result card, by card name in page order."""
+    return {
+        "inputs": dict(max_power=data["max_power"], motor_kv=data["motor_kv"], max_current=data["max_current"],
+                       v_max=data["v_max"], n_parallel=data["n_parallel"], control_type=results["control_type"]),
+        "current": dict(I_cont=round(results["I_cont"], 1), I_cont_power=round(results["I_cont_power"], 1),
+                        I_phase_rms=round(results["I_phase_rms"], 1), I_mos_rms=round(results["I_mos_rms"], 1)),
+        "current_extra": dict(I_mos_peak=round(results["I_mos_peak"], 1), I_mos_min=round(results["I_mos_min"], 1),
+                              eta=round(results["eta"] * 100, 1)),
+        "bemf": dict(max_rpm=round(results["max_rpm"], 0), bemf_voltage=round(results["bemf_voltage"], 1)),
+        "specifications": dict(Vds_min=round(results["Vds_min"], 1),
+                               Id_min=round(results["I_mos_rms"] * DEFAULT_PARAMETERS["k_derate"], 1),
+                               Rds_on_max=round(results["Rds_on_max"], 2)),
+        "power": dict(P_total=round(results["P_total"], 2), mosfet_count=6 * results["n_parallel"],
+                      P_heat=round(results["P_total"] * 6 * results["n_parallel"], 2),
+                      P_cond=round(results["P_cond"], 2), P_sw=round(results["P_sw"], 2), cooling=results["cooling"])
+    }
+
+def render_results(data, results):
+    """Build the HTML of the result cards, to be sent in a single message."""
+    return "".join(render_card(name, **slots) for name, slots in result_card_slots(data, results).items())
+
+def display_results(data, results):
+    """Display calculation results in organized cards."""
+    from pywebio.output import put_html
+    put_html(render_results(data, results))
+
+# Part catalog, loaded on first use
+_part_catalog = None
+_part_catalog_loaded = False
+
+def get_part_catalog():
+    """Load the part catalog named by the MOSFET_CATALOG environment variable, once per process."""
+    global _part_catalog, _part_catalog_loaded
+    if not _part_catalog_loaded:
+        _part_catalog_loaded = True
+        path = os.environ.get("MOSFET_CATALOG")
+        if path:
             try:
-                s.bind(("localhost", port))
-                return port
-            except OSError:
-                port += 1
+                from mosfet_catalog import load_catalog
+                _part_catalog = load_catalog(path)
+            except Exception as e:
+                print(f"Failed to load part catalog {path}: {str(e)}", file=sys.stderr)
+    return _part_catalog
+
+def render_matching_parts(parts):
+    """Build the HTML of the matching parts card."""
+    rows = "".join(f'''
+        <div style="display: flex; justify-content: space-between; align-items: center; margin: 8px 0; padding: 8px 12px; background: #3a3a3a; border-radius: 6px;" class="white-text">
+            <span style="color: #ffffff;">{escape(part["part_number"])} <span style="color: #b0b0b0;">({escape(part["package"])})</span></span>
+            <span class="highlight">{round(part["vds"], 0)} V · {round(part["id"], 0)} A · {round(part["rds_on_25"], 2)} mΩ · ${round(part["price"], 2)}</span>
+        </div>''' for part in parts)
+    if not parts:
+        rows = '<p style="margin: 8px 0; color: #b0b0b0; font-size: 13px;">No catalog parts meet these requirements.</p>'
+
+    return f'''
+    <div class="info-card">
+    <div class="info-card-header">📦 Matching Parts</div>
+    <div style="margin: 12px 0;">{rows}</div>
+    </div>
+    '''
+
+def display_matching_parts(parts):
+    """Display catalog parts that meet the MOSFET specification thresholds."""
+    from pywebio.output import put_html
+    put_html(render_matching_parts(parts))
+
+def engineering_card_slots(results):
+    """Display values of the engineering data card, with 20% margin."""
+    Vds_eng = results["Vds_min"] * 1.2
+    Id_eng = results["I_mos_rms"] * DEFAULT_PARAMETERS["k_derate"] * 1.2
+    Rds_on_eng = results["Rds_on_max"] * 0.8
+
+    return dict(Vds_eng=round(Vds_eng, 1), Id_eng=round(Id_eng, 1), Rds_on_eng=round(Rds_on_eng, 2),
+                Tj=round(results["Tj"], 1), Rds_on_actual=round(DEFAULT_PARAMETERS["Rds_on_assumed"] * 1000, 2),
+                Rds_on_corrected=round(results["Rds_on_corrected"] * 1000, 2),
+                Pd_rds_25=round(results["Pd_rds_25"], 2), Pd_rds_100=round(results["Pd_rds_100"], 2),
+                control_type=results["control_type"])
+
+def render_engineering_data(results):
+    """Build the HTML of the engineering data card with 20% margin."""
+    return render_card("engineering", **engineering_card_slots(results))
+
+def display_engineering_data(results):
+    """Display engineering data with 20% margin."""
+    from pywebio.output import put_html
+    put_html(render_engineering_data(results))
+
+def bind_server_sockets(port=0, host="localhost"):
+    """Bind the listening sockets for the app server and return them with the real port.
+
+    Port 0 lets the OS pick a free port. The sockets stay bound until the server
+    takes them over, so no other process can claim the port in between.
+    """
+    from tornado.netutil import bind_sockets
+    sockets = bind_sockets(port, host)
+    return sockets, sockets[0].getsockname()[1]
+
+def serve_app(app, sockets):
+    """Run a PyWebIO app on already-bound sockets; blocks the calling thread in the Tornado loop."""
+    import asyncio
+    import tornado.httpserver
+    import tornado.ioloop
+    import tornado.web
+    from pywebio.platform.tornado import webio_handler
+    from pywebio.utils import STATIC_PATH
+
+    asyncio.set_event_loop(asyncio.new_event_loop())
+
+    class CountingHandler(webio_handler(app)):
+        """PyWebIO websocket handler that reports sessions and sent bytes to server_metrics."""
+
+        def open(self, *args, **kwargs):
+            server_metrics.session_opened()
+            return super().open(*args, **kwargs)
+
+        def on_close(self):
+            server_metrics.session_closed()
+            return super().on_close()
+
+        def write_message(self, message, binary=False):
+            # Encoded here once; Tornado passes bytes through unchanged
+            if isinstance(message, str):
+                message = message.encode("utf-8")
+            server_metrics.message_sent(len(message))
+            return super().write_message(message, binary)
+
+    class MetricsHandler(tornado.web.RequestHandler):
+        """Prometheus metrics, answered only for requests from this machine."""
+
+        def get(self):
+            if self.request.remote_ip not in ("127.0.0.1", "::1"):
+                raise tornado.web.HTTPError(403)
+            self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.write(server_metrics.render())
+
+    application = tornado.web.Application([
+        (r"/", CountingHandler),
+        (r"/metrics", MetricsHandler),
+        (r"/(.*)", tornado.web.StaticFileHandler, {"path": STATIC_PATH, "default_filename": "index.html"})
+    ], websocket_ping_interval=30)
+    server = tornado.httpserver.HTTPServer(application)
+    server.add_sockets(sockets)
+    tornado.ioloop.IOLoop.current().start()
+
+# Seconds run_desktop_app waits for the PyWebIO server to answer before giving up
+SERVER_START_TIMEOUT = 15.0
+
+def wait_for_server(host, port, server_thread, timeout=SERVER_START_TIMEOUT):
+    """Block until the server accepts connections and answers a first HTTP request.
+
+    Polls with a short backoff instead of sleeping a fixed time. Raises
+    RuntimeError when the server thread exits or the timeout passes first.
+    """
+    import socket
+    import urllib.request
+    deadline = time.monotonic() + timeout
+    delay = 0.01
+    while True:
+        if not server_thread.is_alive():
+            raise RuntimeError("PyWebIO server stopped before it was ready.")
+        try:
+            # Bound socket first, then a health probe of the page itself
+            with socket.create_connection((host, port), timeout=0.5):
+                pass
+            with urllib.request.urlopen(f"http://{host}:{port}/", timeout=max(0.5, deadline - time.monotonic())) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        if time.monotonic() >= deadline:
+            raise RuntimeError(f"PyWebIO server did not answer on http://{host}:{port} within {timeout:g} s.")
+        time.sleep(delay)
+        delay = min(delay * 2, 0.2)
+
+# Live input panel fields as (name, label, help text), in panel order
+LIVE_INPUT_FIELDS = [
+    ("max_power", "Motor Power (W)", "Maximum motor power output"),
+    ("motor_kv", "KV (RPM/V)", "Motor KV value, RPM per Volt"),
+    ("max_current", "Phase RMS Current (A)", "Effective RMS current per motor phase"),
+    ("v_max", "Maximum Voltage (V)", "Maximum system operating voltage"),
+    ("n_parallel", "MOSFET Parallel Count", "Number of parallel MOSFETs per arm (1 for single, 2 for parallel, etc.)"),
+]
+
+# Seconds of quiet after an edit before recalculating, and the longest an update is held back during a burst
+LIVE_UPDATE_DEBOUNCE = 0.015
+LIVE_UPDATE_MAX_DELAY = 0.04
+
+# Replaces the text of every data-slot element named in `values` ({"card.slot": text})
+LIVE_PATCH_JS = """
+for (const [slot, text] of Object.entries(values)) {
+    document.querySelectorAll('[data-slot="' + slot + '"]').forEach(function (element) { element.textContent = text; });
+}
+"""
+
+def displayed_slots(data, results):
+    """Every value shown on the result and engineering cards, keyed by their data-slot name."""
+    cards = dict(result_card_slots(data, results), engineering=engineering_card_slots(results))
+    return {f"{card}.{slot}": value for card, slots in cards.items() for slot, value in slots.items()}
 
 def mosfet_calculator():
-    """Main function to run the MOSFET calculator application."""
+    """Main function to run the MOSFET calculator application.
+
+    The inputs stay on the page as a live panel. Edits are debounced and
+    recalculated incrementally, and only the card values that changed are
+    patched in place, without clearing or re-rendering the page.
+    """
+    # The UI toolkit is only imported once a session starts, keeping the calculation core light to import
+    import pywebio
+    from pywebio.exceptions import SessionException
+    from pywebio.input import FLOAT
+    from pywebio.output import put_html, clear, put_buttons, put_row, put_column, put_error, put_widget, put_scope
+    from pywebio.pin import pin, pin_on_change, put_checkbox, put_input
+    from pywebio.session import get_current_session, local as session_local, run_js
+
     engineering_data_visible = False
+    error_visible = False
+    calculation = IncrementalCalculation()
+    # Panel values as the pins report them: floats, and the checked FOC options
+    defaults = {name: float(DEFAULT_PARAMETERS[name]) for name, _, _ in LIVE_INPUT_FIELDS}
+    defaults["foc"] = [True] if DEFAULT_PARAMETERS["foc"] else []
+    latest = dict(defaults)
+    edited = threading.Event()
+    # Text currently shown in each data-slot element
+    shown = {}
 
     def toggle_engineering_data():
         nonlocal engineering_data_visible
-        clear("engineering_data_scope")  # Clear only the engineering data scope
-        if not engineering_data_visible:
-            with pywebio.output.use_scope("engineering_data_scope"):
-                display_engineering_data(results)
-            engineering_data_visible = True
-        else:
-            engineering_data_visible = False
-
-    def restart_calculator():
-        mosfet_calculator()
-
-    try:
-        clear()
-        add_custom_styles()
-        create_header()
-
-        # Input form (no outer form-group to avoid overlap with header)
-        data = pywebio.input.input_group("", [
-            input("Motor Power (W)", name="max_power", type=FLOAT, value=DEFAULT_PARAMETERS["max_power"],
-                  help_text="Maximum motor power output"),
-            input("KV (RPM/V)", name="motor_kv", type=FLOAT, value=DEFAULT_PARAMETERS["motor_kv"],
-                  help_text="Motor KV value, RPM per Volt"),
-            input("Phase RMS Current (A)", name="max_current", type=FLOAT, value=DEFAULT_PARAMETERS["max_current"],
-                  help_text="Effective RMS current per motor phase"),
-            input("Maximum Voltage (V)", name="v_max", type=FLOAT, value=DEFAULT_PARAMETERS["v_max"],
-                  help_text="Maximum system operating voltage"),
-            input("MOSFET Parallel Count", name="n_parallel", type=FLOAT, value=DEFAULT_PARAMETERS["n_parallel"],
-                  help_text="Number of parallel MOSFETs per arm (1 for single, 2 for parallel, etc.)"),
-            checkbox("Control Options", name="foc", options=[
-                {'label': '🎯 Use FOC Control', 'value': True, 'selected': DEFAULT_PARAMETERS["foc"]}
-            ], help_text="FOC control offers higher efficiency and lower noise")
-        ])
-
-        # Validate inputs
+        with stage_timer.span("engineering_data"):
+            clear("engineering_data_scope")  # Clear only the engineering data scope
+            if not engineering_data_visible:
+                with pywebio.output.use_scope("engineering_data_scope"):
+                    display_engineering_data(session_local.results)
+                engineering_data_visible = True
+            else:
+                engineering_data_visible = False
+
+    def clear_page():
+        with stage_timer.span("clear_button"):
+            clear()
+
+    def reset_inputs():
+        for name, value in defaults.items():
+            pin[name] = latest[name] = value
+        edited.set()
+
+    def on_edit(name):
+        def record(value):
+            latest[name] = value
+            edited.set()
+        return record
+
+    def matching_parts_html(results):
+        catalog = get_part_catalog()
+        if catalog is None:
+            return ""
+        return render_matching_parts(catalog.match_requirements(results, DEFAULT_PARAMETERS, limit=10))
+
+    def recalculate(data):
+        """Validate and calculate the current inputs, returning the changed names and results, or None if invalid."""
         try:
-            validate_inputs(data)
+            with stage_timer.span("validate"):
+                validate_inputs(data)
         except ValueError as e:
-            put_error(str(e))
+            server_metrics.validated(False)
+            with pywebio.output.use_scope("input_error", clear=True):
+                put_error(str(e))
+            return None
+        server_metrics.validated(True)
+        start = time.perf_counter()
+        with stage_timer.span("calculate"):
+            if not calculation.values:
+                # A session's first design is a full recompute, usually of the defaults every session opens
+                # with, so it comes from the shared cache. update() then catches inputs the cache key
+                # normalized away, such as 75 typed where the cached design had 75.0.
+                changed = calculation.load(calculation_cache.get_values(data, DEFAULT_PARAMETERS))
+                changed |= calculation.update(data, DEFAULT_PARAMETERS)
+            else:
+                changed = calculation.update(data, DEFAULT_PARAMETERS)
+            results = calculation.results
+        server_metrics.calculated((time.perf_counter() - start) * 1000)
+        session_local.results = results
+        return changed, results
+
+    def live_update(data):
+        nonlocal error_visible
+        if error_visible:
+            clear("input_error")
+        outcome = recalculate(data)
+        error_visible = outcome is None
+        if error_visible:
             return
+        changed, results = outcome
+        with stage_timer.span("render"):
+            texts = {slot: str(value) for slot, value in displayed_slots(data, results).items()}
+            patch = {slot: text for slot, text in texts.items() if shown.get(slot) != text}
+            shown.update(patch)
+            if patch:
+                run_js(LIVE_PATCH_JS, values=patch)
+            # The matching parts depend on the specification thresholds only
+            if not changed.isdisjoint(("Vds_min", "I_mos_rms", "Rds_on_max")) and get_part_catalog() is not None:
+                with pywebio.output.use_scope("matching_parts", clear=True):
+                    put_html(matching_parts_html(results))
 
-        # Show loading animation
-        put_html("""
-        <div style="text-align: center; margin: 20px 0;">
-            <div class="loading"></div>
-            <p style="color: #b0b0b0; margin-top: 10px; font-size: 14px;">Calculating...</p>
-        </div>
-        """)
-
-        # Perform calculations
-        global results
-        results = calculate_mosfet_params(data, DEFAULT_PARAMETERS)
-
-        # Clear loading animation and display results
-        clear()
-        add_custom_styles()
-        create_header()
-        display_results(data, results)
-
-        # Operation buttons
-        put_html('<hr>')
-        put_row([
-            put_column([
-                put_buttons([
-                    {'label': '🛠️ Engineering Data', 'value': 'eng', 'color': 'success'}
-                ], onclick=lambda _: toggle_engineering_data())
-            ]),
-            put_column([
-                put_buttons([
-                    {'label': '🔄 Recalculate', 'value': 'restart', 'color': 'primary'}
-                ], onclick=lambda _: restart_calculator())
-            ]),
-            put_column([
-                put_buttons([
-                    {'label': '🗑️ Clear', 'value': 'clear', 'color': 'warning'}
-                ], onclick=lambda _: clear())
-            ])
-        ])
+    try:
+        with stage_timer.span("clear"):
+            clear()
 
-        # Footer
-        put_html("""
-        <div class="footer">
-            <p style="margin: 0; font-size: 14px; font-weight: 500;">🚀 MOSFET Calculator v2.0</p>
-            <p style="margin: 4px 0 0 0; font-size: 12px;">Professional motor controller design tool | Powered by PyWebIO</p>
-        </div>
-        """)
+        data = dict(latest)
+        outcome = recalculate(data)
+        if outcome is None:
+            return
+        _, results = outcome
+
+        with stage_timer.span("render"):
+            panel = [
+                put_row([put_input(name, type=FLOAT, label=label, value=latest[name], help_text=help_text)
+                         for name, label, help_text in LIVE_INPUT_FIELDS[:3]]),
+                put_row([put_input(name, type=FLOAT, label=label, value=latest[name], help_text=help_text)
+                         for name, label, help_text in LIVE_INPUT_FIELDS[3:]] + [
+                    put_checkbox("foc", label="Control Options", options=[
+                        {'label': '🎯 Use FOC Control', 'value': True}
+                    ], value=latest["foc"], help_text="FOC control offers higher efficiency and lower noise")
+                ]),
+                put_scope("input_error")
+            ]
+            shown.update((slot, str(value)) for slot, value in displayed_slots(data, results).items())
+
+            # Operation buttons
+            buttons = put_row([
+                put_column([
+                    put_buttons([
+                        {'label': '🛠️ Engineering Data', 'value': 'eng', 'color': 'success'}
+                    ], onclick=lambda _: toggle_engineering_data())
+                ]),
+                put_column([
+                    put_buttons([
+                        {'label': '🔄 Reset Inputs', 'value': 'reset', 'color': 'primary'}
+                    ], onclick=lambda _: reset_inputs())
+                ]),
+                put_column([
+                    put_buttons([
+                        {'label': '🗑️ Clear', 'value': 'clear', 'color': 'warning'}
+                    ], onclick=lambda _: clear_page())
+                ])
+            ])
 
+            # Header, input panel, cards, buttons and footer go out as one message
+            put_widget(STACK_TEMPLATE, dict(contents=[
+                put_html(HEADER_HTML), *panel, put_html(render_results(data, results)),
+                put_scope("matching_parts", [put_html(matching_parts_html(results))]),
+                put_html('<hr>'), buttons, put_html(FOOTER_HTML)
+            ]))
+
+        for name in latest:
+            pin_on_change(name, onchange=on_edit(name))
+
+        # Edits arrive on the callback thread; this session thread coalesces them and applies the latest values
+        session = get_current_session()
+        while not session.closed():
+            if not edited.wait(1.0):
+                continue
+            deadline = time.monotonic() + LIVE_UPDATE_MAX_DELAY
+            edited.clear()
+            while edited.wait(min(LIVE_UPDATE_DEBOUNCE, max(0.0, deadline - time.monotonic()))):
+                edited.clear()
+                if time.monotonic() >= deadline:
+                    break
+            with stage_timer.span("live_update"):
+                live_update(dict(latest))
+
+    except SessionException:
+        # The browser went away; nothing is left to update
+        return
     except Exception as e:
         put_error(f"An error occurred: {str(e)}")
         print(f"Error: {str(e)}", file=sys.stderr)
 
-def run_desktop_app():
-    """Run the MOSFET calculator as a desktop application using PyWebIO and PyWebView."""
+def register_timing_dump():
+    """Make kill -USR1 <pid> print the stage timings so far, when timing is on and the platform has SIGUSR1."""
+    if stage_timer.enabled and hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: stage_timer.dump())
+
+def calculator_app():
+    """The calculator as a PyWebIO app, with the stylesheet served with the page rather than over the websocket."""
+    from pywebio import config
+    return config(css_style=CUSTOM_CSS)(mosfet_calculator)
+
+def run_desktop_app(port=None):
+    """Run the MOSFET calculator as a desktop application using PyWebIO and PyWebView.
+
+    The server listens on ``port``, or on MOSFET_PORT when it is set, and otherwise
+    on a port chosen by the OS.
+    """
+    import webbrowser
+    import webview
+
+    app = calculator_app()
+    register_timing_dump()
     try:
-        port = find_free_port(8080)
+        if port is None:
+            port = int(os.environ.get("MOSFET_PORT", "0"))
+        sockets, port = bind_server_sockets(port)
         print(f"Starting PyWebIO server on http://localhost:{port}")
 
-        # Start PyWebIO server in a separate thread
-        server_thread = threading.Thread(target=start_server, args=(mosfet_calculator,), kwargs={'port': port, 'debug': True})
+        # Start PyWebIO server in a separate thread, on the sockets bound above
+        server_thread = threading.Thread(target=serve_app, args=(app, sockets))
         server_thread.daemon = True
         server_thread.start()
 
-        # Wait a moment for the server to start
-        time.sleep(2)
+        # Wait until the server actually answers
+        wait_for_server("localhost", port, server_thread)
 
         try:
             webview.create_window("🔧 MOSFET Calculator (VESC FOC)", f"http://localhost:{port}",
@@ -800,5 +1282,347 @@ def run_desktop_app():
         print(f"Failed to start application: {str(e)}", file=sys.stderr)
         sys.exit(1)
 
+# Form fields read from each row of a batch file
+BATCH_INPUT_FIELDS = list(NUMBER_FIELDS) + ["foc"]
+
+# Result fields written for each row of a batch file; n_parallel is already among the inputs
+BATCH_RESULT_FIELDS = [key for key in RESULT_FIELDS if key != "n_parallel"]
+
+def check_finite_results(results):
+    """Raise OverflowError if a numeric result is infinite or NaN, which JSON cannot carry."""
+    for key in BATCH_RESULT_FIELDS:
+        value = results[key]
+        if isinstance(value, float) and not math.isfinite(value):
+            raise OverflowError(f"{key} is out of range ({value}).")
+    return results
+
+def read_batch_rows(f, fmt):
+    """Raw rows from a CSV or JSON Lines stream, read one at a time (a ValueError for unreadable rows).
+
+    A CSV header without every input column raises ValueError before any row is
+    read, so a misspelled column cannot silently fall back to its default.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(f)
+        found = reader.fieldnames or []
+        missing = [key for key in BATCH_INPUT_FIELDS if key not in found]
+        if missing:
+            raise ValueError(f"CSV header is missing input columns: {', '.join(missing)} "
+                             f"(found: {', '.join(found) or 'none'}).")
+        return reader
+    return read_jsonl_rows(f)
+
+def read_jsonl_rows(f):
+    """Yield raw rows from a JSON Lines stream, one at a time (a ValueError for unreadable rows)."""
+    for line in f:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            row = ValueError(f"Invalid JSON: {str(e)}")
+        yield row if isinstance(row, (dict, ValueError)) else ValueError("Row must be a JSON object.")
+
+def process_batch_row(number, row, defaults=None):
+    """Validate and calculate one batch row, reporting failures in the output row instead of raising.
+
+    Blank or missing fields are errors unless ``defaults`` supplies them.
+    """
+    output = {"row": number, "status": "ok", "error": ""}
+    if isinstance(row, ValueError):
+        output.update({"status": "error", "error": str(row)})
+        return output
+    for key in BATCH_INPUT_FIELDS:
+        value = row.get(key)
+        if value is None:
+            # Short CSV rows and JSON objects without the field are echoed blank rather than as null
+            value = ""
+        # Rejected NaN and infinite inputs are echoed as text, since JSON has no literal for them
+        output[key] = str(value) if isinstance(value, float) and not math.isfinite(value) else value
+    try:
+        data = validate_inputs(parse_batch_row(row, defaults))
+        results = check_finite_results(calculate_mosfet_params(data, DEFAULT_PARAMETERS))
+    except (ValueError, ZeroDivisionError, OverflowError) as e:
+        output["status"] = "error"
+        output["error"] = str(e)
+        return output
+    for key in BATCH_RESULT_FIELDS:
+        output[key] = results[key]
+    return output
+
+def positive_int(text):
+    """argparse type for counts that must be at least 1."""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+def run_batch_cli(argv):
+    """Stream a CSV or JSON Lines file of designs through the calculator without starting any UI."""
+    parser = argparse.ArgumentParser(prog="mosfet_calculator batch",
+                                     description="Calculate MOSFET requirements for every row of a CSV or JSON Lines file.")
+    parser.add_argument("input", help="Input file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="Output file, or - for stdout (default)")
+    parser.add_argument("--input-format", choices=["csv", "jsonl"], help="Defaults to the input file extension")
+    parser.add_argument("--output-format", choices=["csv", "jsonl"], help="Defaults to the input format")
+    parser.add_argument("--chunk-size", type=positive_int, default=1000, help="Rows processed per write (default 1000)")
+    parser.add_argument("--fill-defaults", action="store_true",
+                        help="Use the calculator defaults for blank or missing fields instead of rejecting the row")
+    args = parser.parse_args(argv)
+    defaults = DEFAULT_PARAMETERS if args.fill_defaults else None
+
+    input_format = args.input_format or ("jsonl" if args.input.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv")
+    output_format = args.output_format or input_format
+    # utf-8-sig drops the byte order mark spreadsheet exports start with, which would hide the first column name
+    try:
+        source = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8-sig")
+    except OSError as e:
+        print(f"Cannot read {args.input}: {e.strerror}", file=sys.stderr)
+        return 2
+    try:
+        rows = enumerate(read_batch_rows(source, input_format), start=1)
+    except ValueError as e:
+        if source is not sys.stdin:
+            source.close()
+        print(f"Cannot read {args.input}: {str(e)}", file=sys.stderr)
+        return 2
+    target = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+
+    processed = failed = 0
+    try:
+        if output_format == "csv":
+            writer = csv.DictWriter(target, fieldnames=["row", "status", "error"] + BATCH_INPUT_FIELDS + BATCH_RESULT_FIELDS)
+            writer.writeheader()
+
+        # Only one chunk of rows is held in memory at a time
+        while True:
+            chunk = [process_batch_row(number, row, defaults) for number, row in itertools.islice(rows, args.chunk_size)]
+            if not chunk:
+                break
+            if output_format == "csv":
+                writer.writerows(chunk)
+            else:
+                target.write("".join(json.dumps(output, ensure_ascii=False) + "\n" for output in chunk))
+            target.flush()
+            processed += len(chunk)
+            failed += sum(1 for output in chunk if output["status"] == "error")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+
+    print(f"Processed {processed} rows, {failed} invalid.", file=sys.stderr)
+    return 0
+
+# Largest JSON API request body accepted, in bytes
+API_MAX_BODY = 16 * 1024 * 1024
+
+# Reason phrases for the status codes the JSON API returns
+API_STATUS_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                      413: "Payload Too Large", 422: "Unprocessable Entity", 431: "Request Header Fields Too Large",
+                      500: "Internal Server Error", 501: "Not Implemented"}
+
+def calculate_design(data):
+    """Calculate one validated design as an API output object, reporting results out of range as errors."""
+    try:
+        results = check_finite_results(calculate_mosfet_params(data, DEFAULT_PARAMETERS))
+    except (ZeroDivisionError, OverflowError) as e:
+        return {"status": "error", "error": str(e)}
+    return {"status": "ok", **{key: results[key] for key in BATCH_RESULT_FIELDS}}
+
+def calculate_designs(designs):
+    """Validate and calculate a list of designs given as JSON objects.
+
+    Every design is checked with the same parsing and validate_inputs as the form
+    and batch mode. Valid designs are then calculated together with the vectorized
+    engine when numpy is installed. Returns one object per design, with
+    status "ok" and the result fields, or status "error" and a message. Designs
+    with a result that is infinite or NaN, which JSON cannot carry, are errors
+    on both paths.
+    """
+    outputs = [None] * len(designs)
+    valid = []
+    for i, design in enumerate(designs):
+        if not isinstance(design, dict):
+            outputs[i] = {"status": "error", "error": "Design must be a JSON object."}
+            continue
+        try:
+            valid.append((i, validate_inputs(parse_batch_row(design))))
+        except ValueError as e:
+            outputs[i] = {"status": "error", "error": str(e)}
+    if not valid:
+        return outputs
+
+    # A single design is cheaper on the scalar path than through numpy
+    calculate_batch = None
+    if len(valid) > 1:
+        try:
+            from mosfet_batch import calculate_mosfet_params_batch as calculate_batch
+        except ImportError:
+            pass
+    if calculate_batch is None:
+        for i, data in valid:
+            outputs[i] = calculate_design(data)
+        return outputs
+
+    import numpy as np
+    columns = {key: [data[key] for _, data in valid] for key in BATCH_INPUT_FIELDS}
+    columns["foc"] = [bool(foc) for foc in columns["foc"]]
+    results = calculate_batch(columns, DEFAULT_PARAMETERS)
+    finite = np.logical_and.reduce([np.isfinite(results[key]) for key in BATCH_RESULT_FIELDS
+                                    if results[key].dtype.kind == "f"]).tolist()
+    values = zip(*(results[key].tolist() for key in BATCH_RESULT_FIELDS))
+    for (i, data), row, ok in zip(valid, values, finite):
+        # Designs out of range are redone on the scalar path, so they get the same error as sent alone
+        outputs[i] = {"status": "ok", **dict(zip(BATCH_RESULT_FIELDS, row))} if ok else calculate_design(data)
+    return outputs
+
+def handle_api_request(method, path, body):
+    """Answer one JSON API request, returning (HTTP status, response object).
+
+    POST /calculate takes a single design object or an array of designs.
+    GET /health reports that the server is up.
+    """
+    path = path.split("?", 1)[0]
+    if path == "/health":
+        if method not in ("GET", "HEAD"):
+            return 405, {"error": "Use GET."}
+        return 200, {"status": "ok"}
+    if path != "/calculate":
+        return 404, {"error": f"Unknown path: {path}"}
+    if method != "POST":
+        return 405, {"error": "Use POST."}
+
+    try:
+        designs = json.loads(body)
+    except ValueError as e:
+        return 400, {"error": f"Invalid JSON: {str(e)}"}
+    if isinstance(designs, list):
+        return 200, calculate_designs(designs)
+    if isinstance(designs, dict):
+        output = calculate_designs([designs])[0]
+        return (200 if output["status"] == "ok" else 422), output
+    return 400, {"error": "Body must be a design object or an array of designs."}
+
+def api_response(status, payload, keep_alive, head_only=False):
+    """Encode a JSON API response with its HTTP/1.1 headers; ``head_only`` leaves out the body, as HEAD requires."""
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {API_STATUS_REASONS[status]}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + (b"" if head_only else body)
+
+async def handle_api_connection(reader, writer):
+    """Serve JSON API requests on one connection until the client closes it or asks to."""
+    import asyncio
+    try:
+        while True:
+            # readline() raises ValueError for a line longer than the stream limit (64 KiB)
+            try:
+                request_line = await reader.readline()
+            except ValueError:
+                writer.write(api_response(400, {"error": "Request line too long."}, False))
+                break
+            if not request_line.strip():
+                break
+            try:
+                method, path, version = request_line.decode("latin-1").split()
+            except ValueError:
+                writer.write(api_response(400, {"error": "Malformed request line."}, False))
+                break
+
+            headers = {}
+            try:
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+            except ValueError:
+                writer.write(api_response(431, {"error": "Request header line too long."}, False))
+                break
+
+            connection = headers.get("connection", "").lower()
+            keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+            if headers.get("transfer-encoding", "identity").lower() != "identity":
+                writer.write(api_response(501, {"error": "Transfer-Encoding is not supported; send Content-Length."},
+                                          False))
+                break
+            try:
+                length = int(headers.get("content-length") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                writer.write(api_response(400, {"error": "Invalid Content-Length."}, False))
+                break
+            if length > API_MAX_BODY:
+                writer.write(api_response(413, {"error": f"Body exceeds {API_MAX_BODY} bytes."}, False))
+                break
+
+            body = await reader.readexactly(length) if length else b""
+            head_only = method == "HEAD"
+            try:
+                response = api_response(*handle_api_request(method, path, body), keep_alive, head_only)
+            except Exception:
+                # A bug in one request must not leave the client waiting on a dropped connection
+                traceback.print_exc()
+                response = api_response(500, {"error": "Internal server error."}, keep_alive, head_only)
+            writer.write(response)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+def run_api_cli(argv):
+    """Serve the calculation core as a JSON HTTP API without any browser session."""
+    import asyncio
+    parser = argparse.ArgumentParser(prog="mosfet_calculator api",
+                                     description="Serve MOSFET calculations as a JSON HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on (default 8000)")
+    args = parser.parse_args(argv)
+
+    async def serve():
+        server = await asyncio.start_server(handle_api_connection, args.host, args.port)
+        print(f"Serving JSON API on http://{args.host}:{args.port}/calculate", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def run_server_cli(argv):
+    """Serve the calculator to browsers, with metrics, without opening a desktop window."""
+    parser = argparse.ArgumentParser(prog="mosfet_calculator serve",
+                                     description="Serve the MOSFET calculator to browsers without a desktop window.")
+    parser.add_argument("--host", default="localhost", help="Address to listen on (default localhost)")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("MOSFET_PORT", "8080")),
+                        help="Port to listen on, 0 for any free port (default MOSFET_PORT or 8080)")
+    args = parser.parse_args(argv)
+
+    register_timing_dump()
+    sockets, port = bind_server_sockets(args.port, args.host)
+    print(f"Serving MOSFET calculator on http://{args.host}:{port}/ (metrics at /metrics)", file=sys.stderr)
+    try:
+        serve_app(calculator_app(), sockets)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        sys.exit(run_batch_cli(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "api":
+        sys.exit(run_api_cli(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        sys.exit(run_server_cli(sys.argv[2:]))
     run_desktop_app()
\ No newline at end of file
@@ -0,0 +1,267 @@
+import csv
+import json
+import mmap
+import os
+import sys
+import numpy as np
+
+# Numeric catalog columns, in datasheet units
+NUMERIC_COLUMNS = {
+    "vds": "V",            # Drain-source voltage rating
+    "id": "A",             # Continuous drain current rating
+    "rds_on_25": "mΩ",     # Rds(on) at Tj = 25 °C
+    "rds_on_100": "mΩ",    # Rds(on) at Tj = 100 °C
+    "qg": "nC",            # Total gate charge
+    "t_r": "ns",           # Rise time
+    "t_f": "ns",           # Fall time
+    "rth": "°C/W",         # Junction-to-case thermal resistance
+    "price": "USD"         # Unit price
+}
+
+# Text catalog columns
+TEXT_COLUMNS = ("part_number", "package")
+
+# Columns with a sorted index for range queries
+INDEXED_COLUMNS = ("vds", "id", "rds_on_25", "rds_on_100")
+
+# Leading bytes of a binary catalog file, and the alignment of each section in it
+CATALOG_MAGIC = b"MOSCAT1\0"
+SECTION_ALIGN = 64
+
+class PartCatalog:
+    """Columnar MOSFET part catalog with sorted indexes for threshold queries.
+
+    Rows are stored in ascending Vds order. Every indexed column also keeps the
+    permutation that sorts it, so each threshold maps to a contiguous run of rows
+    found by binary search instead of a scan over the whole catalog.
+    """
+
+    def __init__(self, columns, index=None):
+        missing = [key for key in tuple(NUMERIC_COLUMNS) + TEXT_COLUMNS if key not in columns]
+        if missing:
+            raise ValueError(f"Catalog is missing columns: {', '.join(missing)}")
+        self.columns = columns
+        if index is None:
+            index = _build_index(columns)
+        self.orders, self.sorted_values, self.valid_counts = index
+
+    @classmethod
+    def from_records(cls, records):
+        """Build a catalog from part dicts keyed by the catalog column names."""
+        records = list(records)
+        columns = {}
+        for key in NUMERIC_COLUMNS:
+            columns[key] = np.array([_to_float(record.get(key)) for record in records], dtype=np.float64)
+        for key in TEXT_COLUMNS:
+            columns[key] = np.array([str(record.get(key) or "") for record in records], dtype=object)
+
+        # Store rows in Vds order so the primary index needs no permutation
+        order = np.argsort(columns["vds"], kind="stable")
+        return cls({key: value[order] for key, value in columns.items()})
+
+    @classmethod
+    def load_csv(cls, path):
+        """Load a catalog from a CSV file with a header row of column names."""
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls.from_records(csv.DictReader(f))
+
+    @classmethod
+    def load_json(cls, path):
+        """Load a catalog from a JSON array of parts or a JSON Lines file."""
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        if text.lstrip().startswith("["):
+            return cls.from_records(json.loads(text))
+        return cls.from_records(json.loads(line) for line in text.splitlines() if line.strip())
+
+    def save(self, path):
+        """Write the catalog and its indexes in the binary columnar format read by open()."""
+        n = len(self)
+        sections = []
+        header = {"rows": n, "columns": {}, "orders": {}, "sorted": {},
+                  "valid_counts": self.valid_counts, "strings": {}}
+
+        # Intern every text value once; text columns then hold fixed-width codes
+        strings = sorted({self.columns[key][i] for key in TEXT_COLUMNS for i in range(n)})
+        codes = {value: code for code, value in enumerate(strings)}
+        encoded = [value.encode("utf-8") for value in strings]
+        string_offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+        np.cumsum([len(value) for value in encoded], out=string_offsets[1:])
+        sections.append((header["strings"], "offsets", string_offsets))
+        sections.append((header["strings"], "data", np.frombuffer(b"".join(encoded), dtype=np.uint8)))
+
+        for key in NUMERIC_COLUMNS:
+            sections.append((header["columns"], key, np.ascontiguousarray(self.columns[key], dtype="<f8")))
+        for key in TEXT_COLUMNS:
+            values = np.array([codes[self.columns[key][i]] for i in range(n)], dtype="<u4")
+            sections.append((header["columns"], key, values))
+        for key in INDEXED_COLUMNS:
+            sections.append((header["orders"], key, np.ascontiguousarray(self.orders[key], dtype="<u4")))
+            sections.append((header["sorted"], key, np.ascontiguousarray(self.sorted_values[key], dtype="<f8")))
+
+        # Lay sections out after the header, each aligned for direct array views
+        offset = 0
+        for table, key, values in sections:
+            table[key] = {"dtype": values.dtype.str, "count": len(values), "offset": offset}
+            offset = _align(offset + values.nbytes)
+        header_bytes = json.dumps(header).encode("utf-8")
+        data_start = _align(len(CATALOG_MAGIC) + 8 + len(header_bytes))
+
+        with open(path, "wb") as f:
+            f.write(CATALOG_MAGIC)
+            f.write(len(header_bytes).to_bytes(8, "little"))
+            f.write(header_bytes)
+            for table, key, values in sections:
+                f.write(b"\0" * (data_start + table[key]["offset"] - f.tell()))
+                f.write(values.tobytes())
+
+    @classmethod
+    def open(cls, path):
+        """Open a binary catalog through a read-only memory map without copying its columns.
+
+        Pages are loaded on demand and shared between every process that maps the
+        same file, so opening costs the same regardless of catalog size.
+        """
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if buffer[:len(CATALOG_MAGIC)] != CATALOG_MAGIC:
+            raise ValueError(f"{path} is not a MOSFET catalog file")
+        header_length = int.from_bytes(buffer[len(CATALOG_MAGIC):len(CATALOG_MAGIC) + 8], "little")
+        header_start = len(CATALOG_MAGIC) + 8
+        header = json.loads(buffer[header_start:header_start + header_length].decode("utf-8"))
+        data_start = _align(header_start + header_length)
+
+        def view(entry):
+            return np.frombuffer(buffer, dtype=entry["dtype"], count=entry["count"],
+                                 offset=data_start + entry["offset"])
+
+        strings = _StringTable(buffer, view(header["strings"]["offsets"]),
+                               data_start + header["strings"]["data"]["offset"])
+        columns = {key: view(header["columns"][key]) for key in NUMERIC_COLUMNS}
+        for key in TEXT_COLUMNS:
+            columns[key] = _TextColumn(view(header["columns"][key]), strings)
+        index = ({key: view(header["orders"][key]) for key in INDEXED_COLUMNS},
+                 {key: view(header["sorted"][key]) for key in INDEXED_COLUMNS},
+                 header["valid_counts"])
+        return cls(columns, index)
+
+    def __len__(self):
+        return len(self.columns["vds"])
+
+    def part(self, index):
+        """Return one catalog row as a dict."""
+        return {key: (value[index].item() if hasattr(value[index], "item") else value[index])
+                for key, value in self.columns.items()}
+
+    def loss_parameters(self, indices=None):
+        """Per-part loss model parameters in DEFAULT_PARAMETERS units, ready for a sweep axis.
+
+        t_r_f is the sum of rise and fall time, matching the 1/2 · V · I · (tr + tf) · f
+        switching loss term.
+        """
+        if indices is None:
+            indices = np.arange(len(self))
+        return {
+            "Rds_on_assumed": self.columns["rds_on_25"][indices] / 1000,
+            "Qg": self.columns["qg"][indices] * 1e-9,
+            "t_r_f": (self.columns["t_r"][indices] + self.columns["t_f"][indices]) * 1e-9
+        }
+
+    def _range(self, key, lower=None, upper=None):
+        """Row indices with lower < value < upper, found by binary search on the sorted column."""
+        values = self.sorted_values[key]
+        start = 0 if lower is None else np.searchsorted(values, lower, side="right")
+        stop = self.valid_counts[key] if upper is None else np.searchsorted(values, upper, side="left")
+        return self.orders[key][start:max(start, stop)]
+
+    def query(self, vds_min=None, id_min=None, rds_on_max=None, rds_column="rds_on_25"):
+        """Return indices of parts with Vds > vds_min, Id > id_min and Rds(on) < rds_on_max.
+
+        Each bound is resolved by binary search; only the narrowest candidate run is
+        then checked against the remaining bounds. Results are sorted by price.
+        """
+        bounds = [(key, lower, upper) for key, lower, upper in (
+            ("vds", vds_min, None), ("id", id_min, None), (rds_column, None, rds_on_max))
+            if lower is not None or upper is not None]
+        if not bounds:
+            candidates = np.arange(len(self))
+        else:
+            runs = [(self._range(key, lower, upper), key) for key, lower, upper in bounds]
+            candidates, narrowest = min(runs, key=lambda run: len(run[0]))
+            for key, lower, upper in bounds:
+                if key == narrowest:
+                    continue
+                values = self.columns[key][candidates]
+                keep = values > lower if lower is not None else values < upper
+                candidates = candidates[keep]
+        return candidates[np.argsort(self.columns["price"][candidates], kind="stable")]
+
+    def match_requirements(self, results, params, limit=None):
+        """Parts meeting the thresholds shown on the MOSFET Specifications card."""
+        indices = self.query(vds_min=results["Vds_min"],
+                             id_min=results["I_mos_rms"] * params["k_derate"],
+                             rds_on_max=results["Rds_on_max"])
+        if limit is not None:
+            indices = indices[:limit]
+        return [self.part(index) for index in indices]
+
+class _StringTable:
+    """Interned strings stored back to back in a mapped buffer, addressed by code."""
+
+    def __init__(self, buffer, offsets, data_start):
+        self.buffer = buffer
+        self.offsets = offsets
+        self.data_start = data_start
+
+    def __getitem__(self, code):
+        start = self.data_start + int(self.offsets[code])
+        stop = self.data_start + int(self.offsets[code + 1])
+        return self.buffer[start:stop].decode("utf-8")
+
+class _TextColumn:
+    """Text column backed by fixed-width codes into a shared string table."""
+
+    def __init__(self, codes, strings):
+        self.codes = codes
+        self.strings = strings
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        return self.strings[int(self.codes[index])]
+
+def _build_index(columns):
+    """Sort permutations, sorted copies and non-blank counts for the indexed columns."""
+    orders = {key: np.argsort(columns[key], kind="stable") for key in INDEXED_COLUMNS}
+    sorted_values = {key: columns[key][orders[key]] for key in INDEXED_COLUMNS}
+
+    # Blank cells sort last as NaN and must never satisfy a lower bound
+    valid_counts = {key: int(np.count_nonzero(~np.isnan(values))) for key, values in sorted_values.items()}
+    return orders, sorted_values, valid_counts
+
+def _align(offset):
+    """Round a byte offset up to the next section boundary."""
+    return -(-offset // SECTION_ALIGN) * SECTION_ALIGN
+
+def load_catalog(path):
+    """Load a catalog from a binary .mcat file, CSV, JSON or JSON Lines, chosen by extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".mcat":
+        return PartCatalog.open(path)
+    if extension == ".csv":
+        return PartCatalog.load_csv(path)
+    return PartCatalog.load_json(path)
+
+def _to_float(value):
+    """Parse a catalog cell, treating blanks as missing."""
+    if value is None or value == "":
+        return float("nan")
+    return float(value)
+
+if __name__ == "__main__":
+    # Convert a CSV/JSON catalog into the binary format: mosfet_catalog.py parts.csv parts.mcat
+    if len(sys.argv) != 3:
+        print("Usage: mosfet_catalog.py SOURCE DEST.mcat", file=sys.stderr)
+        sys.exit(2)
+    load_catalog(sys.argv[1]).save(sys.argv[2])
@@ -0,0 +1,339 @@
+import functools
+import math
+import operator
+
+# Constants for MOSFET calculations
+DEFAULT_PARAMETERS = {
+    "max_power": 2700.0,  # Motor power in Watts
+    "motor_kv": 190.0,    # Motor KV (RPM/V)
+    "max_current": 75.0,  # Phase RMS current in Amps
+    "v_max": 60.0,        # Maximum voltage in Volts
+    "foc": True,          # Default to FOC control
+    "n_parallel": 2,      # Number of parallel MOSFETs
+    "k_margin": 1.5,      # Voltage margin factor
+    "k_derate": 1.3,      # Current derating factor
+    "D": 0.8,             # Duty cycle
+    "f_sw": 30000,        # Switching frequency in Hz
+    "t_r_f": 100e-9,     # Rise/fall time in seconds
+    "Qg": 100e-9,         # Gate charge in Coulombs
+    "Vgs": 10,            # Gate-source voltage in Volts
+    "Rds_on_assumed": 0.0015,  # Assumed Rds(on) in Ohms
+    "Pd_max": 50,          # Maximum power dissipation in Watts
+    "Ta": 25.0,           # Ambient temperature in °C
+    "Rth": 2.0,           # Assumed thermal resistance in °C/W
+    "alpha": 0.007        # Temperature coefficient for Rds(on) per °C
+}
+
+# Form fields read by the calculation, in form order; every other name it reads is a parameter
+INPUT_FIELDS = ("max_power", "motor_kv", "max_current", "v_max", "foc", "n_parallel")
+
+# Form fields that take numbers; foc is the FOC checkbox
+NUMBER_FIELDS = tuple(key for key in INPUT_FIELDS if key != "foc")
+
+# Parameter keys read by calculate_mosfet_params
+PARAMETER_FIELDS = ("k_margin", "k_derate", "D", "f_sw", "t_r_f", "Qg", "Vgs",
+                    "Rds_on_assumed", "Pd_max", "Ta", "Rth", "alpha")
+
+# Result keys, in the order calculate_mosfet_params returns them
+RESULT_FIELDS = ("I_cont", "I_cont_power", "I_phase_rms", "I_mos_rms", "I_mos_peak", "I_mos_min",
+                 "max_rpm", "bemf_voltage", "Vds_min", "Rds_on_max", "P_total", "P_cond", "P_sw",
+                 "cooling", "control_type", "eta", "n_parallel", "Tj", "Rds_on_corrected",
+                 "Pd_rds_25", "Pd_rds_100")
+
+def validate_inputs(data):
+    """Validate user inputs to ensure they are positive and reasonable."""
+    for key in NUMBER_FIELDS:
+        if data[key] is None:
+            raise ValueError(f"{key.replace('_', ' ').title()} must be a number.")
+        # NaN would pass the sign check below and turn every result into NaN
+        if not math.isfinite(data[key]):
+            raise ValueError(f"{key.replace('_', ' ').title()} must be a finite number.")
+        if data[key] <= 0:
+            raise ValueError(f"{key.replace('_', ' ').title()} must be positive.")
+    return data
+
+def _checked(foc):
+    """Whether the FOC checkbox ([True] or []) is ticked; batch columns arrive as booleans already."""
+    if hasattr(foc, "shape"):
+        return foc
+    return foc[0] if foc else False
+
+def _select(condition, if_true, if_false):
+    """``if_true`` where ``condition`` holds and ``if_false`` elsewhere, for one design or NumPy columns."""
+    if hasattr(condition, "shape"):
+        import numpy as np
+        return np.where(condition, if_true, if_false)
+    return if_true if condition else if_false
+
+def _maximum(a, b):
+    """The larger of two values, element-wise for NumPy columns."""
+    if hasattr(a, "shape") or hasattr(b, "shape"):
+        import numpy as np
+        return np.maximum(a, b)
+    return max(a, b)
+
+# The calculation as a dependency graph, in evaluation order. Each entry computes one value from form
+# fields, parameters and earlier entries; a formula's argument names are its dependencies. Formulas work
+# on a single design for IncrementalCalculation and, through calculate_mosfet_params_batch, on NumPy
+# columns. calculate_mosfet_params repeats them as straight-line code, since a full recompute through
+# the graph is several times slower; mosfet_batch.py checks that both give the same results.
+CALCULATION_GRAPH = [
+    # Efficiency based on control type
+    ("use_foc", lambda foc: _checked(foc)),
+    ("eta", lambda use_foc: _select(use_foc, 0.95, 0.90)),
+    ("control_type", lambda use_foc: _select(use_foc, "FOC", "BLDC")),
+
+    # Battery-side DC current
+    ("I_phase_rms", lambda max_current: max_current),
+    ("I_cont", lambda I_phase_rms, eta: I_phase_rms * math.sqrt(3) / (math.sqrt(2) * eta)),
+    ("I_cont_power", lambda max_power, v_max, eta: max_power / (v_max * eta)),
+
+    # Per-MOSFET current
+    ("I_mos_rms", lambda I_phase_rms, n_parallel: I_phase_rms / n_parallel),
+    ("I_mos_peak", lambda I_phase_rms, n_parallel: (I_phase_rms * math.sqrt(2)) / n_parallel),
+    ("I_mos_min", lambda I_mos_rms, k_derate: I_mos_rms * k_derate),
+    # Squared by multiplication so scalar and vectorized paths round identically
+    ("I_mos_rms_sq", lambda I_mos_rms: I_mos_rms * I_mos_rms),
+
+    # Voltage requirements (considering BEMF)
+    ("max_rpm", lambda motor_kv, v_max: motor_kv * v_max),
+    ("bemf_voltage", lambda max_rpm, motor_kv: max_rpm / motor_kv * 0.9),
+    ("Vds_min", lambda v_max, bemf_voltage, k_margin: _maximum(v_max, bemf_voltage) * k_margin),
+
+    # Maximum Rds(on)
+    ("Rds_on_max", lambda Pd_max, I_mos_rms_sq, D: (Pd_max / (I_mos_rms_sq * D)) * 1000),
+
+    # Power dissipation
+    ("P_cond", lambda I_mos_rms_sq, Rds_on_assumed, D: I_mos_rms_sq * Rds_on_assumed * D),
+    ("P_sw", lambda v_max, I_mos_peak, t_r_f, f_sw, Qg, Vgs: (v_max * I_mos_peak * t_r_f * f_sw) / 2 + (Qg * Vgs * f_sw)),
+    ("P_total", lambda P_cond, P_sw: P_cond + P_sw),
+
+    # Cooling recommendation
+    ("cooling", lambda P_total: _select(P_total < 30, "被動散熱", "強制風冷")),
+
+    # Thermal estimates
+    ("Tj", lambda Ta, P_total, Rth: Ta + P_total * Rth),
+    ("Rds_on_corrected", lambda Rds_on_assumed, alpha, Tj: Rds_on_assumed * (1 + alpha * (Tj - 25))),
+    ("Pd_rds_25", lambda I_mos_rms_sq, Rds_on_assumed, D: I_mos_rms_sq * Rds_on_assumed * D),
+    ("Pd_rds_100", lambda I_mos_rms_sq, Rds_on_assumed, alpha, D:
+        I_mos_rms_sq * Rds_on_assumed * (1 + alpha * (100 - 25)) * D),
+]
+
+def _reader(keys):
+    """Function returning the values of ``keys`` in a dict as a tuple."""
+    if len(keys) == 1:
+        key, = keys
+        return lambda values: (values[key],)
+    return operator.itemgetter(*keys)
+
+def compile_graph(graph):
+    """Each graph entry as (name, formula, dependencies, read), plus the form fields and parameters the graph reads.
+
+    ``read(values)`` gathers a formula's arguments from the dict of values computed so far.
+    """
+    nodes = []
+    known = set(INPUT_FIELDS + PARAMETER_FIELDS)
+    for name, formula in graph:
+        code = formula.__code__
+        dependencies = code.co_varnames[:code.co_argcount]
+        unknown = [key for key in dependencies if key not in known]
+        if unknown:
+            raise ValueError(f"Graph entry {name} reads unknown values: {', '.join(unknown)}")
+        nodes.append((name, formula, dependencies, _reader(dependencies)))
+        known.add(name)
+    computed = {node[0] for node in nodes}
+    sources = tuple(dict.fromkeys(key for node in nodes for key in node[2] if key not in computed))
+    return tuple(nodes), sources
+
+CALCULATION_NODES, CALCULATION_SOURCES = compile_graph(CALCULATION_GRAPH)
+
+# The form fields and the parameters among the sources, read in one step each
+CALCULATION_INPUTS = tuple(key for key in CALCULATION_SOURCES if key in INPUT_FIELDS)
+CALCULATION_PARAMETERS = tuple(key for key in CALCULATION_SOURCES if key not in INPUT_FIELDS)
+_read_inputs = _reader(CALCULATION_INPUTS)
+_read_parameters = _reader(CALCULATION_PARAMETERS)
+
+def evaluate_graph(values, nodes=CALCULATION_NODES):
+    """Compute ``nodes`` in order into ``values``, which must already hold everything they read, and return it."""
+    for name, formula, _, read in nodes:
+        values[name] = formula(*read(values))
+    return values
+
+def calculate_graph_values(data, params):
+    """Every value in the calculation graph for one design, inputs and intermediate results included."""
+    values = dict(zip(CALCULATION_INPUTS, _read_inputs(data)))
+    values.update(zip(CALCULATION_PARAMETERS, _read_parameters(params)))
+    return evaluate_graph(values)
+
+def calculate_mosfet_params(data, params):
+    """Perform MOSFET calculations based on input data and fixed parameters.
+
+    The same formulas as CALCULATION_GRAPH, written out in graph order.
+    """
+    max_power = data["max_power"]
+    motor_kv = data["motor_kv"]
+    max_current = data["max_current"]
+    v_max = data["v_max"]
+    foc = data["foc"][0] if data["foc"] else False
+    n_parallel = data["n_parallel"]
+    D = params["D"]
+    Rds_on_assumed = params["Rds_on_assumed"]
+    alpha = params["alpha"]
+    f_sw = params["f_sw"]
+
+    # Efficiency based on control type
+    eta = 0.95 if foc else 0.90
+
+    # Battery-side DC current
+    I_phase_rms = max_current
+    I_cont = I_phase_rms * math.sqrt(3) / (math.sqrt(2) * eta)
+    I_cont_power = max_power / (v_max * eta)
+
+    # Per-MOSFET current
+    I_mos_rms = I_phase_rms / n_parallel
+    I_mos_peak = (I_phase_rms * math.sqrt(2)) / n_parallel
+    I_mos_min = I_mos_rms * params["k_derate"]
+    I_mos_rms_sq = I_mos_rms * I_mos_rms
+
+    # Voltage requirements (considering BEMF)
+    max_rpm = motor_kv * v_max
+    bemf_voltage = max_rpm / motor_kv * 0.9
+    Vds_min = max(v_max, bemf_voltage) * params["k_margin"]
+
+    # Maximum Rds(on)
+    Rds_on_max = (params["Pd_max"] / (I_mos_rms_sq * D)) * 1000
+
+    # Power dissipation
+    P_cond = I_mos_rms_sq * Rds_on_assumed * D
+    P_sw = (v_max * I_mos_peak * params["t_r_f"] * f_sw) / 2 + (params["Qg"] * params["Vgs"] * f_sw)
+    P_total = P_cond + P_sw
+
+    # Thermal estimates
+    Tj = params["Ta"] + P_total * params["Rth"]
+
+    return {
+        "I_cont": I_cont,
+        "I_cont_power": I_cont_power,
+        "I_phase_rms": I_phase_rms,
+        "I_mos_rms": I_mos_rms,
+        "I_mos_peak": I_mos_peak,
+        "I_mos_min": I_mos_min,
+        "max_rpm": max_rpm,
+        "bemf_voltage": bemf_voltage,
+        "Vds_min": Vds_min,
+        "Rds_on_max": Rds_on_max,
+        "P_total": P_total,
+        "P_cond": P_cond,
+        "P_sw": P_sw,
+        "cooling": "被動散熱" if P_total < 30 else "強制風冷",
+        "control_type": "FOC" if foc else "BLDC",
+        "eta": eta,
+        "n_parallel": n_parallel,
+        "Tj": Tj,
+        "Rds_on_corrected": Rds_on_assumed * (1 + alpha * (Tj - 25)),
+        "Pd_rds_25": I_mos_rms_sq * Rds_on_assumed * D,
+        "Pd_rds_100": I_mos_rms_sq * Rds_on_assumed * (1 + alpha * (100 - 25)) * D
+    }
+
+@functools.lru_cache(maxsize=256)
+def downstream_nodes(changed):
+    """The graph entries downstream of the ``changed`` form fields and parameters, in graph order."""
+    nodes = []
+    stale = set(changed)
+    for node in CALCULATION_NODES:
+        if not stale.isdisjoint(node[2]):
+            stale.add(node[0])
+            nodes.append(node)
+    return tuple(nodes)
+
+class IncrementalCalculation:
+    """One design's results, kept current by recomputing only what an input change reaches.
+
+    update() finds the form fields and parameters that changed and recomputes
+    just the graph entries downstream of them: changing n_parallel leaves
+    max_rpm, bemf_voltage and Vds_min alone. It reports the names whose values
+    actually changed, so only the affected outputs need rendering again.
+    """
+
+    def __init__(self):
+        self.values = {}
+
+    def update(self, data, params):
+        """Bring the results up to date with new form data and parameters, returning the names that changed."""
+        values = self.values
+        changed = set()
+        for key in CALCULATION_SOURCES:
+            value = data[key] if key in INPUT_FIELDS else params[key]
+            if key not in values or not _same_value(values[key], value):
+                values[key] = value
+                changed.add(key)
+        if not changed:
+            return changed
+
+        try:
+            for name, formula, _, read in downstream_nodes(frozenset(changed)):
+                value = formula(*read(values))
+                if name not in values or not _same_value(values[name], value):
+                    values[name] = value
+                    changed.add(name)
+        except Exception:
+            # The inputs are already stored, so the entries would look up to date next time
+            self.values = {}
+            raise
+        return changed
+
+    def load(self, values):
+        """Take over graph values computed elsewhere, e.g. by calculate_graph_values(), returning the names that changed."""
+        changed = {key for key, value in values.items()
+                   if key not in self.values or not _same_value(self.values[key], value)}
+        self.values = dict(values)
+        return changed
+
+    @property
+    def results(self):
+        """The current results, as calculate_mosfet_params returns them."""
+        return {key: self.values[key] for key in RESULT_FIELDS}
+
+def _same_value(old, new):
+    """Whether a value is unchanged; 75 and 75.0 differ since they display differently."""
+    return type(old) is type(new) and old == new
+
+# Spellings of the FOC flag accepted in batch files and API requests, compared case-insensitively
+FOC_TRUE = ("1", "true", "yes", "y", "foc")
+FOC_FALSE = ("0", "false", "no", "n", "bldc")
+
+def parse_batch_row(row, defaults=None):
+    """Turn a raw batch row into form data.
+
+    Every field must be given, as on the form. Pass ``defaults`` (such as
+    DEFAULT_PARAMETERS) to fill blank or missing fields from it instead.
+    """
+    blank = [key for key in INPUT_FIELDS
+             if row.get(key) is None or (isinstance(row[key], str) and not row[key].strip())]
+    if blank and defaults is None:
+        raise ValueError(f"Missing fields: {', '.join(blank)}.")
+
+    data = {}
+    for key in INPUT_FIELDS:
+        label = key.replace('_', ' ').title()
+        value = defaults[key] if key in blank else row[key]
+        if key == "foc":
+            data[key] = _parse_foc(value, label)
+            continue
+        try:
+            data[key] = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{label} must be a number.")
+    return data
+
+def _parse_foc(foc, label):
+    """Read the FOC flag from a boolean, 0/1, a known spelling or a checkbox value, stored like the form checkbox."""
+    if isinstance(foc, (list, tuple)) and len(foc) <= 1:
+        foc = foc[0] if foc else False
+    if isinstance(foc, str):
+        spelling = foc.strip().lower()
+        if spelling in FOC_TRUE or spelling in FOC_FALSE:
+            return [True] if spelling in FOC_TRUE else []
+    elif isinstance(foc, (bool, int, float)) and foc in (0, 1):
+        return [True] if foc else []
+    raise ValueError(f"{label} must be true or false.")
@@ -0,0 +1,84 @@
+import numpy as np
+from mosfet_batch import calculate_mosfet_params_batch
+from mosfet_thermal import CHUNK_SIZE, TransientThermal
+
+# Columns of a drive log: phase RMS current (A), bus voltage (V) and, optionally, motor speed (rpm)
+LOG_COLUMNS = ("current", "voltage", "rpm")
+
+def iter_chunks(columns, chunk_size=CHUNK_SIZE):
+    """Split a dict of equally long log columns (arrays or memory-mapped .npy files) into chunks."""
+    length = len(columns["current"])
+    for start in range(0, length, chunk_size):
+        yield {key: np.asarray(value[start:start + chunk_size], dtype=float) for key, value in columns.items()}
+
+def read_log(path, chunk_size=CHUNK_SIZE):
+    """Stream a CSV drive log with a header naming its columns, ``chunk_size`` rows at a time."""
+    # Binary mode, so peek() can tell the end of the file from a chunk that happened to fill up
+    with open(path, "rb") as f:
+        names = [name.strip() for name in f.readline().decode("utf-8-sig").split(",")]
+        missing = [key for key in LOG_COLUMNS[:2] if key not in names]
+        if missing:
+            raise KeyError(f"Missing drive log columns: {', '.join(missing)}")
+        while f.peek(1):
+            rows = np.loadtxt(f, delimiter=",", max_rows=chunk_size, ndmin=2, encoding="utf-8")
+            if len(rows):
+                yield {key: rows[:, i] for i, key in enumerate(names) if key in LOG_COLUMNS}
+
+def drive_cycle(chunks, data, params, dt, network=None):
+    """Energy, average losses and peak Tj of one MOSFET over a drive log streamed in chunks.
+
+    Every sample runs through the calculator's loss formulas with its own phase
+    current (regenerative current counts by magnitude) and bus voltage. With an
+    ``rpm`` column the duty cycle follows the motor's back-EMF,
+    rpm / (motor_kv · voltage), up to the ``D`` parameter; without one it stays
+    at ``D``. Losses use the 25 °C Rds(on) as on the result cards.
+
+    With a thermal ``network`` from mosfet_thermal, Tj(t) is simulated across
+    the whole log. Without one, the peak is the steady-state Tj of the worst
+    sample, an upper bound for any network with the same Rth. Only running
+    totals are kept, so memory does not grow with the length of the log.
+    """
+    thermal = TransientThermal(network, dt, params["Ta"]) if network is not None else None
+    samples = 0
+    energy = {"P_cond": 0.0, "P_sw": 0.0, "P_total": 0.0}
+    peak = {"P_total": 0.0, "Tj": float(params["Ta"])}
+    peak_sample = {"P_total": 0, "Tj": 0}
+
+    for chunk in chunks:
+        design = dict(data, max_current=np.abs(chunk["current"]), v_max=chunk["voltage"])
+        chunk_params = params
+        if "rpm" in chunk:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                duty = chunk["rpm"] / (float(data["motor_kv"]) * chunk["voltage"])
+            chunk_params = dict(params, D=np.clip(np.nan_to_num(duty), 0.0, params["D"]))
+        losses = calculate_mosfet_params_batch(design, chunk_params)
+        tj = thermal.run(losses["P_total"]) if thermal is not None else losses["Tj"]
+        if not len(tj):
+            continue
+
+        for key in energy:
+            energy[key] += float(losses[key].sum()) * dt
+        for key, values in (("P_total", losses["P_total"]), ("Tj", tj)):
+            index = int(np.argmax(values))
+            if values[index] > peak[key]:
+                peak[key], peak_sample[key] = float(values[index]), samples + index
+        samples += len(tj)
+
+    duration = samples * dt
+    n_parallel = float(data["n_parallel"])
+    return {
+        "samples": samples,
+        "duration": duration,
+        "energy": energy["P_total"],
+        "energy_cond": energy["P_cond"],
+        "energy_sw": energy["P_sw"],
+        # All six switch positions, as for the total heat on the Power Dissipation card
+        "inverter_energy": energy["P_total"] * 6 * n_parallel,
+        "P_avg": energy["P_total"] / duration if duration else 0.0,
+        "P_cond_avg": energy["P_cond"] / duration if duration else 0.0,
+        "P_sw_avg": energy["P_sw"] / duration if duration else 0.0,
+        "P_peak": peak["P_total"],
+        "P_peak_time": peak_sample["P_total"] * dt,
+        "Tj_peak": peak["Tj"],
+        "Tj_peak_time": peak_sample["Tj"] * dt,
+    }
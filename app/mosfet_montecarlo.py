@@ -0,0 +1,90 @@
+import multiprocessing
+import numpy as np
+from mosfet_solver import TJ_MAX, solve_electrothermal
+
+# Spread of each part parameter around its nominal value, as (distribution, tolerance) with the tolerance a
+# fraction. "uniform" and "triangular" span ±tolerance, "normal" has ±tolerance as its 3σ band.
+DEFAULT_TOLERANCES = {
+    "Rds_on_assumed": ("normal", 0.2),
+    "t_r_f": ("uniform", 0.3),
+    "Qg": ("normal", 0.2),
+    "Rth": ("uniform", 0.2),
+    "alpha": ("uniform", 0.2),
+}
+
+# Results summarized by tolerance_analysis() and the percentiles of each reported
+TOLERANCE_OUTPUTS = ("P_cond", "P_sw", "P_total", "Tj", "Rds_on_corrected")
+DEFAULT_PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+# Samples drawn per RNG stream. Each chunk has its own stream, so results depend on the seed and
+# the chunk size but not on how the chunks are spread over processes.
+CHUNK_SIZE = 1 << 16
+
+def draw(rng, nominal, spec, size):
+    """``size`` values around ``nominal`` from a (distribution, tolerance) spec or a callable(rng, nominal, size)."""
+    if callable(spec):
+        return np.asarray(spec(rng, nominal, size), dtype=float)
+    kind, tolerance = spec
+    if kind == "uniform":
+        factor = rng.uniform(1 - tolerance, 1 + tolerance, size)
+    elif kind == "triangular":
+        factor = rng.triangular(1 - tolerance, 1, 1 + tolerance, size)
+    elif kind == "normal":
+        factor = rng.normal(1, tolerance / 3, size)
+    else:
+        raise ValueError(f"Unknown tolerance distribution {kind!r}")
+    # A tolerance of 100% or more could otherwise draw negative resistances and times
+    return nominal * np.maximum(factor, 0.0)
+
+def _run_tolerance_chunk(task):
+    """Solve one chunk of samples drawn from its own seed sequence."""
+    data, params, tolerances, seed, size, tj_max, pd_max = task
+    rng = np.random.default_rng(seed)
+    # Draw in a fixed order so a spec's samples do not depend on dict ordering
+    draws = {key: draw(rng, float(params[key]), tolerances[key], size) for key in sorted(tolerances)}
+    solved = solve_electrothermal(data, dict(params, **draws))
+    chunk = {key: np.broadcast_to(solved[key], (size,)) for key in TOLERANCE_OUTPUTS}
+    chunk["over_pd_max"] = int(np.count_nonzero(solved["P_total"] > pd_max))
+    chunk["over_tj_max"] = int(np.count_nonzero(solved["Tj"] > tj_max))
+    chunk["runaway"] = int(np.count_nonzero(solved["runaway"]))
+    return chunk
+
+def tolerance_analysis(data, params, samples=200000, tolerances=DEFAULT_TOLERANCES, tj_max=TJ_MAX, pd_max=None,
+                       percentiles=DEFAULT_PERCENTILES, seed=0, chunk_size=CHUNK_SIZE, processes=1):
+    """Monte Carlo spread of losses and Tj for one design with the part parameters in ``tolerances`` varied.
+
+    Each sample draws every parameter in ``tolerances`` independently and is
+    solved with the coupled electro-thermal model, so runaway samples count as
+    over the Tj limit. ``pd_max`` defaults to the ``Pd_max`` parameter.
+
+    Samples are drawn in chunks of ``chunk_size``, chunk i from the i-th child
+    of ``np.random.SeedSequence(seed)``. With ``processes`` above 1 the chunks
+    are solved by a pool of worker processes and give the same results as a
+    single process. Callable tolerance specs must then be picklable.
+
+    Returns ``bands``, a dict of output name to {percentile: value}, and the
+    fractions of samples over ``pd_max`` and ``tj_max`` and in thermal runaway.
+    """
+    pd_max = params["Pd_max"] if pd_max is None else pd_max
+    sizes = [min(chunk_size, samples - start) for start in range(0, samples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(data, params, tolerances, chunk_seed, size, tj_max, pd_max) for chunk_seed, size in zip(seeds, sizes)]
+    if processes == 1:
+        chunks = [_run_tolerance_chunk(task) for task in tasks]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            chunks = pool.map(_run_tolerance_chunk, tasks)
+
+    bands = {}
+    for key in TOLERANCE_OUTPUTS:
+        values = np.concatenate([chunk[key] for chunk in chunks])
+        # No interpolation between samples, so runaway samples keep an infinite Tj rather than nan
+        points = np.percentile(values, percentiles, method="inverted_cdf")
+        bands[key] = dict(zip(percentiles, points.tolist()))
+    return {
+        "samples": samples,
+        "bands": bands,
+        "p_over_pd_max": sum(chunk["over_pd_max"] for chunk in chunks) / samples,
+        "p_over_tj_max": sum(chunk["over_tj_max"] for chunk in chunks) / samples,
+        "p_runaway": sum(chunk["runaway"] for chunk in chunks) / samples,
+    }
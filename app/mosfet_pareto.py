@@ -0,0 +1,133 @@
+import numpy as np
+from mosfet_batch import calculate_mosfet_params_batch
+from mosfet_solver import TJ_MAX, solve_electrothermal
+
+# Approximate board area (mm²) of each package's land pattern, through-hole packages mounted flat.
+# Keys are upper case with spaces and dashes removed.
+PACKAGE_AREAS = {
+    "TO220": 165.0, "TO247": 340.0,
+    "D2PAK": 160.0, "TO263": 160.0, "D2PAK7": 160.0, "TO2637": 160.0,
+    "DPAK": 70.0, "TO252": 70.0,
+    "TOLL": 117.0, "TOLT": 117.0,
+    "SO8": 32.0, "PQFN5X6": 32.0, "DFN5X6": 32.0, "LFPAK56": 32.0, "POWERPAKSO8": 32.0, "SUPERSO8": 32.0,
+    "PQFN3X3": 11.0, "DFN3X3": 11.0, "LFPAK33": 11.0,
+}
+
+# Parallel counts and switching frequencies explored unless others are given
+DEFAULT_PARALLEL = range(1, 9)
+DEFAULT_FREQUENCIES = range(10000, 100001, 5000)
+
+# Rows taken from the head of the sorted order at a time, and front rows applied to the rest per comparison
+SKYLINE_BLOCK = 128
+SKYLINE_BATCH = 16
+
+def _dominated(points, pivots):
+    """Matrix of which ``pivots`` are nowhere worse than which ``points``."""
+    mask = points[:, 0, None] >= pivots[None, :, 0]
+    for k in range(1, points.shape[1]):
+        mask &= points[:, k, None] >= pivots[None, :, k]
+    return mask
+
+def skyline(points):
+    """Indices of the rows of ``points`` that no other row dominates, with every column minimized.
+
+    Sort-filter-skyline: duplicate rows are merged and the rest sorted by the sum
+    of their per-column ranks, so a row can only be dominated by rows before it.
+    The head of that order is taken a block at a time. Its rows that survive each
+    other are on the front, and at once discard every later row they dominate.
+    The first front rows usually discard most candidates, so the work grows with
+    the size of the front rather than with the square of the input.
+    """
+    points = np.asarray(points, dtype=float)
+    if not len(points):
+        return np.empty(0, dtype=np.intp)
+    unique, inverse = np.unique(points, axis=0, return_inverse=True)
+    # Dense ranks keep the order exact and cope with infinite values
+    ranks = sum(np.unique(column, return_inverse=True)[1] for column in unique.T)
+    rest_index = np.argsort(ranks, kind="stable")
+    rest = unique[rest_index]
+
+    front = np.zeros(len(unique), dtype=bool)
+    while len(rest):
+        head, head_index = rest[:SKYLINE_BLOCK], rest_index[:SKYLINE_BLOCK]
+        rest, rest_index = rest[SKYLINE_BLOCK:], rest_index[SKYLINE_BLOCK:]
+        # Rows are distinct, so being nowhere worse than an earlier row means being dominated by it
+        survivors = ~np.tril(_dominated(head, head), -1).any(axis=1)
+        head = head[survivors]
+        front[head_index[survivors]] = True
+        for start in range(0, len(head), SKYLINE_BATCH):
+            if not len(rest):
+                break
+            dead = _dominated(rest, head[start:start + SKYLINE_BATCH]).any(axis=1)
+            if dead.any():
+                rest, rest_index = rest[~dead], rest_index[~dead]
+    return np.flatnonzero(front[inverse.ravel()])
+
+def package_area(package, areas=PACKAGE_AREAS):
+    """Board area of one package in mm², or inf for a package not in ``areas``."""
+    return areas.get(package.upper().replace(" ", "").replace("-", ""), float("inf"))
+
+def pareto_front(catalog, data, params, n_parallel=DEFAULT_PARALLEL, f_sw=DEFAULT_FREQUENCIES,
+                 tj_max=TJ_MAX, pd_max=None, areas=PACKAGE_AREAS):
+    """Non-dominated catalog part × n_parallel × f_sw choices for one design.
+
+    Every combination is evaluated with the coupled electro-thermal model.
+    Combinations are dropped when the part is below the Vds or Id thresholds of
+    the MOSFET Specifications card, or when Tj or P_total exceed ``tj_max`` or
+    ``pd_max`` (default ``Pd_max``). Objectives are total heat
+    (P_total · 6 · n_parallel, as on the Power Dissipation card), BOM cost, board
+    area and Tj, all minimized, and f_sw, maximized. Packages missing from
+    ``areas`` count as infinitely large.
+
+    Losses rise with f_sw, so a combination can only be dominated by another at
+    the same frequency. Each frequency is therefore a separate skyline of the
+    other four objectives. Parts that are no better than another part in any
+    rating (Rds(on), Qg, tr + tf, Id, price and package area) never reach the
+    front and are skipped before evaluation.
+
+    Returns a dict of arrays, one entry per front point, sorted by cost.
+    """
+    pd_max = params["Pd_max"] if pd_max is None else pd_max
+    design = calculate_mosfet_params_batch(data, params)
+    parts = catalog.query(vds_min=float(design["Vds_min"]))
+    losses = catalog.loss_parameters(parts)
+    columns = catalog.columns
+    price = np.asarray(columns["price"][parts], dtype=float)
+    id_rating = np.asarray(columns["id"][parts], dtype=float)
+    area = np.array([package_area(columns["package"][i], areas) for i in parts], dtype=float)
+
+    ratings = np.column_stack([losses["Rds_on_assumed"], losses["Qg"], losses["t_r_f"], price, area, -id_rating])
+    usable = np.flatnonzero(~np.isnan(ratings).any(axis=1))
+    keep = usable[skyline(ratings[usable])]
+    parts, price, area, id_rating = parts[keep], price[keep], area[keep], id_rating[keep]
+    part_params = {key: value[keep][:, None] for key, value in losses.items()}
+
+    n = np.asarray(n_parallel, dtype=float)[None, :]
+    cost, board_area = price[:, None] * 6 * n, area[:, None] * 6 * n
+    # Id threshold from the specifications card: I_mos_rms · k_derate
+    rated = id_rating[:, None] > float(np.asarray(data["max_current"])) / n * params["k_derate"]
+
+    found = {key: [] for key in ("part", "n_parallel", "f_sw", "heat", "cost", "area", "Tj", "P_total")}
+    for frequency in np.asarray(f_sw, dtype=float):
+        solved = solve_electrothermal(dict(data, n_parallel=n), dict(params, f_sw=frequency, **part_params))
+        feasible = rated & (solved["Tj"] <= tj_max) & (solved["P_total"] <= pd_max)
+        row, column = np.nonzero(feasible)
+        heat = solved["P_total"][row, column] * 6 * n[0, column]
+        objectives = np.column_stack([heat, cost[row, column], board_area[row, column], solved["Tj"][row, column]])
+        front = skyline(objectives)
+        row, column = row[front], column[front]
+        found["part"].append(parts[row])
+        found["n_parallel"].append(n[0, column].astype(int))
+        found["f_sw"].append(np.full(len(front), frequency))
+        found["heat"].append(heat[front])
+        found["cost"].append(cost[row, column])
+        found["area"].append(board_area[row, column])
+        found["Tj"].append(solved["Tj"][row, column])
+        found["P_total"].append(solved["P_total"][row, column])
+
+    result = {key: np.concatenate(values) for key, values in found.items()}
+    order = np.lexsort((result["heat"], result["cost"]))
+    result = {key: value[order] for key, value in result.items()}
+    result["part_number"] = np.array([columns["part_number"][i] for i in result["part"]], dtype=object)
+    result["package"] = np.array([columns["package"][i] for i in result["part"]], dtype=object)
+    return result
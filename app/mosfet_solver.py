@@ -0,0 +1,172 @@
+import numpy as np
+from mosfet_batch import INPUT_FIELDS, PARAMETER_FIELDS, _columns, _foc_column, calculate_mosfet_params_batch
+
+# Junction temperature limit (°C) used by the inverse solvers unless another is given
+TJ_MAX = 150.0
+
+# Largest parallel count min_parallel() considers
+MAX_PARALLEL = 64
+
+# Times an upper bracket may double before a limit counts as never reached
+MAX_DOUBLINGS = 64
+
+def solve_electrothermal(data, params, tol=1e-6, max_iter=100):
+    """Batch results with Tj, Rds(on) and conduction loss solved together.
+
+    calculate_mosfet_params_batch estimates Tj from losses at the 25 °C Rds(on).
+    Here the hotter Rds(on) is fed back until Tj = Ta + Rth · P_total(Tj)
+    within ``tol`` °C, by Newton steps on that equation. Each iteration only
+    evaluates the designs still moving. A design whose loop gain
+    Rth · dP_total/dTj reaches 1 heats faster than it can shed the heat: it has
+    no fixed point, is flagged as runaway and gets Tj = inf.
+
+    Returns the batch results with P_cond, P_total, cooling, Tj and
+    Rds_on_corrected replaced by the solved values, plus ``iterations``,
+    ``converged`` and ``runaway`` arrays.
+    """
+    results = calculate_mosfet_params_batch(data, params)
+    shape = results["Tj"].shape
+    column = lambda key: np.broadcast_to(np.asarray(params[key], dtype=float), shape).ravel()
+    ta, rth, alpha, rds_25 = column("Ta"), column("Rth"), column("alpha"), column("Rds_on_assumed")
+    # Conduction loss at 25 °C; it scales with Rds(on) as the junction heats up
+    cond_25 = np.ravel(results["Pd_rds_25"])
+    p_sw = np.ravel(results["P_sw"])
+
+    # The open-loop estimate is the first iterate from Tj = 25 °C
+    tj = np.array(results["Tj"], dtype=float).ravel()
+    n = tj.size
+    iterations = np.ones(n, dtype=int)
+    converged = np.zeros(n, dtype=bool)
+    runaway = np.zeros(n, dtype=bool)
+    active = np.flatnonzero(np.isfinite(tj))
+
+    for _ in range(max_iter):
+        if not active.size:
+            break
+        previous = tj[active]
+        cond = cond_25[active] * (1 + alpha[active] * (previous - 25))
+        residual = ta[active] + rth[active] * (p_sw[active] + cond) - previous
+        # Extra junction heating per degree of junction temperature
+        gain = rth[active] * cond_25[active] * alpha[active]
+        unstable = gain >= 1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = np.where(unstable, 0.0, residual / (1 - gain))
+        tj[active] = previous + step
+        iterations[active] += 1
+
+        done = ~unstable & (np.abs(step) <= tol)
+        converged[active[done]] = True
+        runaway[active[unstable]] = True
+        active = active[~(done | unstable)]
+
+    tj[runaway] = np.inf
+    rds_factor = 1 + alpha * (tj - 25)
+    P_cond = cond_25 * rds_factor
+    P_total = P_cond + p_sw
+
+    solved = dict(results)
+    solved.update({
+        "P_cond": P_cond.reshape(shape),
+        "P_total": P_total.reshape(shape),
+        "cooling": np.where(P_total < 30, "被動散熱", "強制風冷").reshape(shape),
+        "Tj": tj.reshape(shape),
+        "Rds_on_corrected": (rds_25 * rds_factor).reshape(shape),
+        "iterations": iterations.reshape(shape),
+        "converged": converged.reshape(shape),
+        "runaway": runaway.reshape(shape),
+    })
+    return solved
+
+def _flat_design(data, params, **limits):
+    """Inputs, parameters and limits broadcast together, as flat columns plus the batch shape."""
+    columns = dict(_columns(data, INPUT_FIELDS), **_columns(params, PARAMETER_FIELDS), **limits)
+    columns = {key: _foc_column(value) if key == "foc" else np.asarray(value, dtype=float)
+               for key, value in columns.items()}
+    shape = np.broadcast(*columns.values()).shape
+    return shape, {key: np.broadcast_to(value, shape).ravel() for key, value in columns.items()}
+
+def _within_limits(columns, field):
+    """Test of whether designs ``index`` keep their solved Tj and P_total within limits with ``field`` at ``value``."""
+    def feasible(index, value):
+        design = {key: column[index] for key, column in columns.items()}
+        design[field] = value
+        solved = solve_electrothermal(design, design)
+        return (solved["Tj"] <= design["tj_max"]) & (solved["P_total"] <= design["pd_max"])
+    return feasible
+
+def _largest_feasible(feasible, start, rtol, max_iter):
+    """Largest value ≥ 0 per design still feasible, when feasibility only fails above some limit.
+
+    The upper bracket starts at ``start`` and doubles until it fails, then the
+    bracket is bisected to a relative width of ``rtol``. Designs infeasible even
+    at 0 get nan, and those never failing get inf.
+    """
+    n = start.size
+    lo = np.zeros(n)
+    hi = np.where(start > 0, start, 1.0)
+    possible = feasible(np.arange(n), lo)
+    growing = np.flatnonzero(possible)
+    for _ in range(MAX_DOUBLINGS):
+        if not growing.size:
+            break
+        ok = feasible(growing, hi[growing])
+        lo[growing[ok]] = hi[growing[ok]]
+        hi[growing[ok]] *= 2
+        growing = growing[ok]
+    lo[growing] = np.inf
+
+    active = np.flatnonzero(possible & np.isfinite(lo))
+    for _ in range(max_iter):
+        active = active[hi[active] - lo[active] > rtol * hi[active]]
+        if not active.size:
+            break
+        middle = (lo[active] + hi[active]) / 2
+        ok = feasible(active, middle)
+        lo[active[ok]] = middle[ok]
+        hi[active[~ok]] = middle[~ok]
+    lo[~possible] = np.nan
+    return lo
+
+def min_parallel(data, params, tj_max=TJ_MAX, pd_max=None, n_max=MAX_PARALLEL):
+    """Fewest parallel MOSFETs per switch keeping the solved Tj and P_total within limits.
+
+    ``pd_max`` defaults to the ``Pd_max`` parameter. Counts are bisected between
+    1 and ``n_max`` for all designs at once; 0 means even ``n_max`` is not enough.
+    """
+    pd_max = params["Pd_max"] if pd_max is None else pd_max
+    shape, columns = _flat_design(data, params, tj_max=tj_max, pd_max=pd_max)
+    feasible = _within_limits(columns, "n_parallel")
+    n = columns["n_parallel"].size
+    lo = np.zeros(n, dtype=int)
+    hi = np.full(n, n_max, dtype=int)
+    reachable = feasible(np.arange(n), hi)
+    active = np.flatnonzero(reachable)
+    while active.size:
+        active = active[hi[active] - lo[active] > 1]
+        middle = (lo[active] + hi[active]) // 2
+        ok = feasible(active, middle)
+        hi[active[ok]] = middle[ok]
+        lo[active[~ok]] = middle[~ok]
+    return np.where(reachable, hi, 0).reshape(shape)
+
+def max_current(data, params, tj_max=TJ_MAX, pd_max=None, rtol=1e-6, max_iter=100):
+    """Highest phase RMS current (A) keeping the solved Tj and P_total within limits.
+
+    ``pd_max`` defaults to the ``Pd_max`` parameter. nan marks designs over a
+    limit even with no current, from switching losses alone.
+    """
+    pd_max = params["Pd_max"] if pd_max is None else pd_max
+    shape, columns = _flat_design(data, params, tj_max=tj_max, pd_max=pd_max)
+    limit = _largest_feasible(_within_limits(columns, "max_current"), columns["max_current"], rtol, max_iter)
+    return limit.reshape(shape)
+
+def max_switching_frequency(data, params, loss_budget=None, tj_max=TJ_MAX, rtol=1e-6, max_iter=100):
+    """Highest f_sw (Hz) keeping each MOSFET's solved P_total within ``loss_budget`` W and Tj within ``tj_max``.
+
+    ``loss_budget`` defaults to the ``Pd_max`` parameter. nan marks designs over
+    budget from conduction losses alone.
+    """
+    loss_budget = params["Pd_max"] if loss_budget is None else loss_budget
+    shape, columns = _flat_design(data, params, tj_max=tj_max, pd_max=loss_budget)
+    limit = _largest_feasible(_within_limits(columns, "f_sw"), columns["f_sw"], rtol, max_iter)
+    return limit.reshape(shape)
@@ -0,0 +1,235 @@
+import math
+import numpy as np
+
+# Largest growth factor exp(GROWTH_LIMIT) a block of the scaled running sum may reach before it is rebased
+GROWTH_LIMIT = 50.0
+
+# Blocks per chunk above which a mode is filtered by prefix doubling instead of scaled running sums
+MAX_BLOCKS = 16
+
+# Samples simulated per chunk by simulate(), bounding its working memory
+CHUNK_SIZE = 1 << 20
+
+class FosterNetwork:
+    """Foster RC network, the form datasheets give Zth curves in.
+
+    Zth(t) = Σ R_i · (1 - exp(-t / τ_i)), with R in °C/W and τ in seconds. The
+    nodes of a Foster network have no physical meaning, so two Foster networks
+    cannot simply be stacked; convert to Cauer form to add a heatsink.
+    """
+
+    def __init__(self, r, tau):
+        self.r = np.atleast_1d(np.asarray(r, dtype=float))
+        self.tau = np.atleast_1d(np.asarray(tau, dtype=float))
+        if self.r.shape != self.tau.shape:
+            raise ValueError("Foster network needs one time constant per resistance")
+        if np.any(self.tau <= 0):
+            raise ValueError("Foster time constants must be positive")
+
+    @classmethod
+    def fit(cls, t, zth, n_terms=4):
+        """Fit a Foster network to points read off a datasheet Zth curve.
+
+        Time constants are spread logarithmically over the curve and the
+        resistances found by least squares, dropping any term that comes out
+        negative until all are physical.
+        """
+        t = np.asarray(t, dtype=float)
+        zth = np.asarray(zth, dtype=float)
+        tau = np.logspace(math.log10(t.min()), math.log10(t.max()), n_terms)
+        keep = np.ones(n_terms, dtype=bool)
+        while True:
+            basis = 1 - np.exp(-t[:, None] / tau[keep])
+            r = np.linalg.lstsq(basis, zth, rcond=None)[0]
+            if np.all(r >= 0):
+                break
+            keep[np.flatnonzero(keep)[np.argmin(r)]] = False
+        return cls(r, tau[keep])
+
+    @property
+    def rth(self):
+        """Steady-state thermal resistance."""
+        return float(self.r.sum())
+
+    def zth(self, t):
+        """Thermal impedance at times ``t``."""
+        t = np.asarray(t, dtype=float)
+        return (self.r * (1 - np.exp(-t[..., None] / self.tau))).sum(axis=-1)
+
+    def to_foster(self):
+        return self
+
+    def to_cauer(self):
+        """Equivalent Cauer ladder, found by continued-fraction expansion of Zth(s).
+
+        Z(s) = Σ R_i / (1 + s·τ_i) is written as N(s) / D(s), and capacitances and
+        resistances are peeled off the admittance D / N from the highest order
+        down. Well conditioned for the handful of terms datasheets give.
+        """
+        order = np.argsort(self.tau)
+        r, tau = self.r[order], self.tau[order]
+        # Polynomials in s, highest power first
+        denominator = np.array([1.0])
+        for t in tau:
+            denominator = np.polymul(denominator, [t, 1.0])
+        numerator = np.zeros(1)
+        for i in range(len(r)):
+            term = np.array([r[i]])
+            for j, t in enumerate(tau):
+                if j != i:
+                    term = np.polymul(term, [t, 1.0])
+            numerator = np.polyadd(numerator, term)
+
+        resistances, capacitances = [], []
+        # Admittance D / N: take out s·C, invert, take out R, invert, ...
+        for _ in range(len(r)):
+            c = denominator[0] / numerator[0]
+            remainder = np.polysub(denominator, np.polymul([c, 0.0], numerator))[1:]
+            r_stage = numerator[0] / remainder[0]
+            denominator, numerator = numerator, remainder
+            numerator_next = np.polysub(denominator, r_stage * numerator)[1:]
+            capacitances.append(c)
+            resistances.append(r_stage)
+            denominator, numerator = numerator, numerator_next
+        return CauerNetwork(resistances, capacitances)
+
+class CauerNetwork:
+    """Cauer RC ladder from junction to ambient.
+
+    Node i has capacitance C_i (J/°C) to ambient and resistance R_i (°C/W) to the
+    next node; the last resistance ends at ambient. Unlike Foster nodes these are
+    physical, so ladders chain: junction-to-case followed by case-to-ambient.
+    """
+
+    def __init__(self, r, c):
+        self.r = np.atleast_1d(np.asarray(r, dtype=float))
+        self.c = np.atleast_1d(np.asarray(c, dtype=float))
+        if self.r.shape != self.c.shape:
+            raise ValueError("Cauer network needs one capacitance per resistance")
+        if np.any(self.r <= 0) or np.any(self.c <= 0):
+            raise ValueError("Cauer resistances and capacitances must be positive")
+
+    def then(self, other):
+        """This ladder followed by another, e.g. junction-to-case then heatsink."""
+        other = other if isinstance(other, CauerNetwork) else other.to_cauer()
+        return CauerNetwork(np.concatenate([self.r, other.r]), np.concatenate([self.c, other.c]))
+
+    @property
+    def rth(self):
+        """Steady-state thermal resistance."""
+        return float(self.r.sum())
+
+    def to_cauer(self):
+        return self
+
+    def to_foster(self):
+        """Equivalent Foster network seen from the junction, from the ladder's eigenmodes.
+
+        The ladder obeys C·dT/dt = -G·T + P·e1. With M = C^-1/2 G C^-1/2 = V Λ Vᵀ
+        the junction impedance is Σ w_k² / (s + λ_k) with w = Vᵀ e1 / √C1, i.e.
+        Foster terms τ_k = 1 / λ_k and R_k = w_k² / λ_k.
+        """
+        n = len(self.r)
+        conductance = np.zeros((n, n))
+        for i, r in enumerate(self.r):
+            g = 1 / r
+            conductance[i, i] += g
+            if i + 1 < n:
+                conductance[i + 1, i + 1] += g
+                conductance[i, i + 1] -= g
+                conductance[i + 1, i] -= g
+        scale = 1 / np.sqrt(self.c)
+        eigenvalues, vectors = np.linalg.eigh(conductance * scale[:, None] * scale[None, :])
+        weights = vectors[0] * scale[0]
+        return FosterNetwork(weights ** 2 / eigenvalues, 1 / eigenvalues)
+
+    def zth(self, t):
+        return self.to_foster().zth(t)
+
+def _filter_mode(decay, drive, initial):
+    """Run x[k] = decay · x[k-1] + drive[k-1] from x[0] = initial and return x[1:].
+
+    Slow modes use a scaled running sum, rebased every block before the scale
+    factor exp(GROWTH_LIMIT) is reached. Fast modes would need too many blocks,
+    so they use prefix doubling instead, stopping once decay^shift is negligible.
+    """
+    n = len(drive)
+    if decay < 1e-300:
+        return drive.copy()
+    rate = -math.log(decay)
+    block = max(1, int(GROWTH_LIMIT / rate)) if rate > 0 else n
+    if n <= block * MAX_BLOCKS:
+        out = np.empty(n)
+        state = initial
+        for start in range(0, n, block):
+            segment = drive[start:start + block]
+            powers = decay ** np.arange(1, len(segment) + 1)
+            out[start:start + len(segment)] = powers * (state + np.cumsum(segment / powers))
+            state = out[start + len(segment) - 1]
+        return out
+
+    values = np.concatenate([[initial], drive])
+    factor = decay
+    shift = 1
+    # decay^shift below machine epsilon: older samples no longer contribute
+    while shift < len(values) and factor > 1e-17:
+        values[shift:] = values[shift:] + factor * values[:-shift]
+        factor *= factor
+        shift *= 2
+    return values[1:]
+
+class TransientThermal:
+    """Junction temperature response of a thermal network to a sampled power profile.
+
+    Power is held constant over each sample of length ``dt`` (zero-order hold),
+    for which every Foster mode has the exact update
+    θ_i[k+1] = a_i · θ_i[k] + R_i · (1 - a_i) · P[k] with a_i = exp(-dt / τ_i).
+    Each mode is filtered with whole-array operations. The mode temperatures carry
+    over between calls, so long profiles can be streamed in chunks.
+    """
+
+    def __init__(self, network, dt, ta=25.0):
+        foster = network.to_foster()
+        self.dt = dt
+        self.ta = ta
+        self.decay = np.exp(-dt / foster.tau)
+        self.gain = foster.r * (1 - self.decay)
+        self.state = np.zeros(len(foster.r))
+
+    def run(self, power):
+        """Junction temperature at the end of each sample of ``power`` (W)."""
+        power = np.asarray(power, dtype=float)
+        tj = np.full(len(power), float(self.ta))
+        for i, (decay, gain) in enumerate(zip(self.decay, self.gain)):
+            theta = _filter_mode(decay, gain * power, self.state[i])
+            if len(theta):
+                self.state[i] = theta[-1]
+            tj += theta
+        return tj
+
+    @property
+    def tj(self):
+        """Current junction temperature."""
+        return self.ta + float(self.state.sum())
+
+def simulate(network, power, dt, ta=25.0, chunk_size=CHUNK_SIZE):
+    """Tj(t) for a whole power profile, simulated chunk by chunk."""
+    power = np.asarray(power, dtype=float)
+    model = TransientThermal(network, dt, ta)
+    tj = np.empty(len(power))
+    for start in range(0, len(power), chunk_size):
+        tj[start:start + chunk_size] = model.run(power[start:start + chunk_size])
+    return tj
+
+def peak_tj(network, power_chunks, dt, ta=25.0):
+    """Peak junction temperature and the sample it occurs at, streaming power in chunks."""
+    model = TransientThermal(network, dt, ta)
+    peak, peak_index, offset = ta, 0, 0
+    for chunk in power_chunks:
+        tj = model.run(chunk)
+        if len(tj):
+            index = int(np.argmax(tj))
+            if tj[index] > peak:
+                peak, peak_index = float(tj[index]), offset + index
+        offset += len(tj)
+    return peak, peak_index